@@ -0,0 +1,197 @@
+import heapq
+import math
+
+from point import Point
+
+"""
+Any-angle path planning with Theta* and Lazy Theta* (Nash et al., 2007 and
+2010). Like A* on octile moves, except that a generated cell takes the parent
+of its parent whenever the two can see each other, so the path is a short
+list of waypoints instead of a staircase of single steps.
+
+Line of sight follows the units' own move model: two cells see each other when
+every cell of the Bresenham line between them is passable. A segment between
+waypoints is therefore always walkable with octile moves (corner cutting
+allowed, as in jump_point.py), and expand turns waypoints back into the
+exact steps a unit takes.
+
+Segment costs are movement_cost evaluated on the two waypoints, which is the
+cost of walking the segment for the geometric costs in movement_cost.py.
+Theta* paths are usually, but not provably, no longer than A* paths. Lazy
+Theta* trades a little length for far fewer line of sight checks.
+"""
+
+
+def line(start, end):
+    """
+    Cells of the Bresenham line from start to end with one octile step per
+    cell. The line between two cells is the same in both directions.
+
+    Return:
+        List[Point]: cells after start up to and including end
+    """
+    if (end.x, end.y) < (start.x, start.y):
+        return list(reversed(line(end, start)[:-1])) + [end]
+
+    (x, y) = start
+    delta_x, delta_y = abs(end.x - x), abs(end.y - y)
+    step_x = 1 if end.x > x else -1
+    step_y = 1 if end.y > y else -1
+    error = delta_x - delta_y
+    cells = []
+    while (x, y) != (end.x, end.y):
+        double_error = 2 * error
+        if double_error > -delta_y:
+            error -= delta_y
+            x += step_x
+        if double_error < delta_x:
+            error += delta_x
+            y += step_y
+        cells.append(Point(x, y))
+    return cells
+
+
+def line_of_sight(grid, start, end):
+    """
+    Return:
+        bool: whether every cell of the line after start is passable
+    """
+    passable, index = grid.passable, grid.index
+    for cell in line(start, end):
+        if not passable[index(cell)]:
+            return False
+    return True
+
+
+def iter_steps(start, waypoints, moves=None):
+    """
+    Expands waypoints into single steps lazily, one segment at a time
+
+    Args:
+        start (Point): position the waypoints start from
+        waypoints (List[Point]): waypoints after start
+        moves: move set of the path, a segment that is one of the moves is taken
+            as a single step instead of being drawn as a line
+
+    Yields:
+        Point: next step
+    """
+    moves = frozenset(moves or ())
+    for waypoint in waypoints:
+        if waypoint - start in moves:
+            yield waypoint
+        else:
+            yield from line(start, waypoint)
+        start = waypoint
+
+
+def expand(start, waypoints, moves=None):
+    """
+    Return:
+        List[Point]: per step path after start, in the same format as PathFinder.find_path
+    """
+    return list(iter_steps(start, waypoints, moves))
+
+
+def compact(start, path):
+    """
+    Reduces a per step path to the cells where it changes direction. Only runs
+    of unit steps are merged, a step longer than one cell, such as (2, 1) of
+    moves.bc19_4_radius, is a waypoint of its own. The result expands back into
+    the same path when expand is given the move set of the path.
+
+    Return:
+        List[Point]: waypoints after start
+    """
+    waypoints = []
+    prev, direction = start, None
+    for cell in path:
+        step = cell - prev
+        if direction is not None and (step != direction or max(abs(step.x), abs(step.y)) > 1):
+            waypoints.append(prev)
+        direction, prev = step, cell
+    if path:
+        waypoints.append(path[-1])
+    return waypoints
+
+
+def theta_star(grid, moves, start, end, movement_cost, heuristic_cost, max_nodes, lazy=True):
+    """
+    Args:
+        grid (Grid): map to search on
+        moves: octile moves, neighbours of an expanded cell
+        start: x and y coordinates of start point
+        end: x and y coordinates of end point
+        movement_cost: cost between any two cells, must satisfy the triangle inequality
+        heuristic_cost: assumed movement cost function
+        max_nodes: max number of valid nodes to process
+        lazy (bool): Lazy Theta* checks line of sight once per expanded cell
+            instead of once per generated cell
+
+    Returns:
+        (waypoints, expanded): waypoints after start, empty if no path was found
+            within max_nodes, and the number of nodes expanded
+    """
+    if not (grid.contains(start) and grid.contains(end)):
+        return [], 0
+
+    passable, index, to_point = grid.passable, grid.index, grid.point
+    offsets = grid.offsets(moves)
+    start_index, end_index = index(start), index(end)
+    g = {start_index: 0}
+    parent = {start_index: start_index}
+    closed = set()
+    h = heuristic_cost(start, end)
+    queue = [(h, h, start_index)]
+    expanded = 0
+
+    def sees(a, b):
+        return line_of_sight(grid, to_point(a), to_point(b))
+
+    def cost(a, b):
+        return movement_cost(to_point(a), to_point(b))
+
+    while queue and max_nodes > 0:
+        (_, _, cur) = heapq.heappop(queue)
+        if cur in closed:
+            continue
+
+        if lazy and not sees(parent[cur], cur):
+            # assumed line of sight failed, take the best expanded neighbour as parent
+            best = math.inf
+            for offset in offsets:
+                nxt = cur + offset
+                if nxt in closed and g[nxt] + cost(nxt, cur) < best:
+                    best, parent[cur] = g[nxt] + cost(nxt, cur), nxt
+            g[cur] = best
+
+        if cur == end_index:
+            waypoints = []
+            while cur != start_index:
+                waypoints.append(to_point(cur))
+                cur = parent[cur]
+            waypoints.reverse()
+            return waypoints, expanded
+
+        closed.add(cur)
+        expanded += 1
+        origin = parent[cur]
+        for offset in offsets:
+            nxt = cur + offset
+            if not passable[nxt]:
+                continue
+            max_nodes -= 1
+            if nxt in closed:
+                continue
+            # path 2 goes straight from the parent of cur, path 1 through cur
+            if lazy or sees(origin, nxt):
+                via, score = origin, g[origin] + cost(origin, nxt)
+            else:
+                via, score = cur, g[cur] + cost(cur, nxt)
+            if score < g.get(nxt, math.inf):
+                g[nxt] = score
+                parent[nxt] = via
+                h = heuristic_cost(to_point(nxt), end)
+                heapq.heappush(queue, (score + h, h, nxt))
+
+    return [], expanded
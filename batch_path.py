@@ -0,0 +1,118 @@
+import multiprocessing
+import time
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+import numpy as np
+
+import helper
+from path_finding import PathFinder
+
+"""
+Batched path queries solved on a process pool. The static map is copied once
+into shared memory and every worker builds its own PathFinder on top of it
+when it starts, so tasks only carry (moves, start, end) and results.
+
+Workers are started with fork where the platform supports it, so cost and
+validity functions do not need to be picklable. With spawn they must be.
+
+multiprocessing.shared_memory needs Python 3.8. On older versions the map is
+passed to the pool initializer instead, so every worker keeps its own copy.
+"""
+
+_worker_finder = None
+_worker_memory = None
+
+
+def _init_worker(map_source, shape, movement_cost, heuristic_cost, engine):
+    """map_source is the name of the shared memory block or, without shared memory, the map itself"""
+    global _worker_finder, _worker_memory
+    if shared_memory is None:
+        map_data = map_source
+    else:
+        _worker_memory = shared_memory.SharedMemory(name=map_source)
+        map_data = np.ndarray(shape, dtype=bool, buffer=_worker_memory.buf)
+    _worker_finder = PathFinder(movement_cost, heuristic_cost, None, map_data, engine)
+
+
+def _solve(query):
+    moves, start, end = query
+    start_time = time.perf_counter()
+    path = _worker_finder.find_path(moves, start, end)
+    stats = {
+        'nodes_expanded': _worker_finder.nodes_expanded,
+        'path_length': len(path),
+        'time': time.perf_counter() - start_time,
+    }
+    return path, stats
+
+
+class BatchPathFinder:
+    """
+    Solves many independent path queries, or the segments of a waypoint list,
+    in parallel. Use as a context manager or call close to stop the pool and
+    free the shared map.
+    """
+
+    def __init__(self, map_data, movement_cost, heuristic_cost, engine='array', processes=None):
+        """
+        Args:
+            map_data: Boolean numpy array. True for passable, False for impassable.
+            movement_cost: real movement cost function
+            heuristic_cost: assumed movement cost function
+            engine: grid based PathFinder engine used by the workers
+            processes (int): number of worker processes, cpu count if None
+        """
+        map_data = np.asarray(map_data, dtype=bool)
+        if shared_memory is None:
+            self.memory = None
+            map_source = map_data
+        else:
+            self.memory = shared_memory.SharedMemory(create=True, size=max(map_data.nbytes, 1))
+            shared = np.ndarray(map_data.shape, dtype=bool, buffer=self.memory.buf)
+            shared[:] = map_data
+            map_source = self.memory.name
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        self.pool = context.Pool(processes, initializer=_init_worker,
+                                 initargs=(map_source, map_data.shape, movement_cost, heuristic_cost, engine))
+
+    def find_paths(self, queries, chunksize=1):
+        """
+        Args:
+            queries: list of (moves, start, end) tuples
+            chunksize (int): number of queries sent to a worker at once
+
+        Return:
+            List[(List[Point], Dictionary)]: path and stats of each query in query order,
+                stats contain nodes_expanded, path_length and time in seconds
+        """
+        return self.pool.map(_solve, [tuple(query) for query in queries], chunksize)
+
+    def find_path_waypoints(self, moves, waypoints):
+        """
+        Solves all waypoint segments in parallel and joins them
+
+        Return:
+            (List[Point], List[Dictionary]): path through all waypoints and stats of each segment
+        """
+        results = self.find_paths([(moves, start, end) for start, end in helper.pairwise(waypoints)])
+        paths = [path for path, _ in results]
+        return PathFinder.join_segments(paths), [stats for _, stats in results]
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        if self.memory is not None:
+            self.memory.close()
+            self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
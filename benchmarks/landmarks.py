@@ -0,0 +1,50 @@
+"""
+Compares node expansions of array A* with the octile heuristic against the
+landmark heuristic on maze like Perlin maps.
+
+Run from the repository root:
+    python -m benchmarks.landmarks
+"""
+import random
+import time
+
+from landmarks import LandmarkHeuristic
+from mapworks.map_generator import generate_map
+from movement_cost import diagonal_cost
+from moves import adjacent_octile
+from path_finding import PathFinder
+from point import Point
+
+
+def run(size=256, obstacle_density=0.35, seed=25, queries=50, count=8):
+    map_data = generate_map(size, size, obstacle_density=obstacle_density, seed=seed)
+    moves = adjacent_octile()
+    cost = diagonal_cost()
+
+    start_time = time.perf_counter()
+    alt = LandmarkHeuristic.build(map_data, moves, cost, count=count, base=cost)
+    build_time = time.perf_counter() - start_time
+
+    octile_finder = PathFinder(cost, cost, None, map_data, 'array')
+    alt_finder = PathFinder(cost, alt, None, map_data, 'array')
+
+    free = [Point(int(x), int(y)) for y, x in zip(*map_data.nonzero())]
+    rng = random.Random(seed)
+    totals = {'octile': [0, 0.0], 'alt': [0, 0.0]}
+    for _ in range(queries):
+        start, end = rng.sample(free, 2)
+        for name, finder in (('octile', octile_finder), ('alt', alt_finder)):
+            start_time = time.perf_counter()
+            finder.find_path(moves, start, end, size * size * len(moves))
+            totals[name][1] += time.perf_counter() - start_time
+            totals[name][0] += finder.nodes_expanded
+
+    print("map {0}x{0}, density {1}, {2} landmarks built in {3:.2f}s".format(size, obstacle_density, count,
+                                                                            build_time))
+    for name, (expanded, elapsed) in totals.items():
+        print("{:>6}: {:>9} expansions, {:.1f} ms per query".format(name, expanded, elapsed / queries * 1000))
+    print("expansion reduction: {:.1f}x".format(totals['octile'][0] / max(totals['alt'][0], 1)))
+
+
+if __name__ == "__main__":
+    run()
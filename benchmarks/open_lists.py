@@ -0,0 +1,92 @@
+"""
+Compares the open lists of the array A* engine on the same queries: the
+heapq list with duplicate entries, the indexed heap with decrease-key and the
+bucket queue. Each structure is also timed on its own by replaying the
+push and pop sequence recorded from one A* query.
+
+Run from the repository root:
+    python -m benchmarks.open_lists
+"""
+import heapq
+import random
+import time
+
+from mapworks.map_generator import generate_map
+from movement_cost import diagonal_cost
+from moves import adjacent_octile
+from path_finding import PathFinder
+from point import Point
+from priority_queue import BucketQueue, IndexedHeap
+
+
+class _Recorder(IndexedHeap):
+    """Indexed heap that records its operations for replay."""
+
+    log = []
+
+    def push(self, priority, item):
+        _Recorder.log.append((priority[0], item))
+        return super().push(priority, item)
+
+    def pop(self):
+        _Recorder.log.append(None)
+        return super().pop()
+
+
+def _replay_heapq(log):
+    queue = []
+    for operation in log:
+        if operation is None:
+            heapq.heappop(queue)
+        else:
+            heapq.heappush(queue, operation)
+
+
+def _replay(queue, log):
+    for operation in log:
+        if operation is None:
+            queue.pop()
+        else:
+            queue.push(*operation)
+
+
+def run(size=256, obstacle_density=0.35, seed=25, queries=50):
+    map_data = generate_map(size, size, obstacle_density=obstacle_density, seed=seed)
+    moves = adjacent_octile()
+    cost = diagonal_cost()
+    finder = PathFinder(cost, cost, None, map_data, 'array')
+
+    free = [Point(int(x), int(y)) for y, x in zip(*map_data.nonzero())]
+    rng = random.Random(seed)
+    pairs = [rng.sample(free, 2) for _ in range(queries)]
+    print("map {0}x{0}, density {1}, {2} queries".format(size, obstacle_density, queries))
+
+    for open_list in PathFinder.OPEN_LISTS:
+        expanded, start_time = 0, time.perf_counter()
+        for start, end in pairs:
+            finder.search(moves, start, end, size * size * len(moves), open_list)
+            expanded += finder.nodes_expanded
+        elapsed = time.perf_counter() - start_time
+        print("{:>8}: {:>9} expansions, {:.2f} ms per query".format(open_list, expanded,
+                                                                   elapsed / queries * 1000))
+
+    # replay the open list operations of the longest query on each structure alone
+    longest = max(pairs, key=lambda pair: pair[0].dist(pair[1]))
+    PathFinder.OPEN_LISTS['record'] = _Recorder
+    try:
+        finder.search(moves, longest[0], longest[1], size * size * len(moves), 'record')
+    finally:
+        del PathFinder.OPEN_LISTS['record']
+    log = _Recorder.log
+    pops = log.count(None)
+    print("replay of {} pushes and {} pops".format(len(log) - pops, pops))
+    for name, replay in (('heap', _replay_heapq),
+                         ('indexed', lambda log: _replay(IndexedHeap(), log)),
+                         ('bucket', lambda log: _replay(BucketQueue(), log))):
+        start_time = time.perf_counter()
+        replay(log)
+        print("{:>8}: {:.2f} ms".format(name, (time.perf_counter() - start_time) * 1000))
+
+
+if __name__ == "__main__":
+    run()
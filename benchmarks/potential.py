@@ -0,0 +1,87 @@
+"""
+Compares Map.next_pos_potential against the per position, per actor Python
+loop it replaced, with a mix of path, wall, enemy and unit actors, and checks
+that both give the same scores.
+
+Run from the repository root:
+    python -m benchmarks.potential
+"""
+import random
+import time
+
+from game_map import Map
+from mapworks.map_generator import generate_map
+from mock_object import EnemyObject, PathObject, WallObject
+from moves import adjacent_octile, bc19_9_radius
+from pheromone import pheromone
+from point import Point
+from potential_func import inert_repel
+from unit import Unit
+
+
+def loop_potential(game_map, cur_unit, next_pos):
+    """Scores as computed before potential_engine, one poten_at call per position and actor."""
+    def poten(actors):
+        scores = [0] * len(next_pos)
+        for i, pos in enumerate(next_pos):
+            for actor in actors:
+                scores[i] += actor.poten_at(pos)
+        return scores
+
+    total = [a + b for a, b in zip(poten(game_map.mock), poten(game_map.visible_units(cur_unit)))]
+    return [(score, pos) for score, pos in zip(total, next_pos)]
+
+
+def run(size=100, actors=120, path_length=20, repeats=20, seed=3):
+    rng = random.Random(seed)
+    map_data = generate_map(size, size, obstacle_density=0.3, seed=seed)
+    game_map = Map(map_data)
+    enemies = pheromone(~map_data, adjacent_octile())
+    free = [(x, y) for x, y in zip(*map_data.nonzero())]
+    for x, y in rng.sample(free, 20):
+        enemies.addEnemy(x, y)
+    enemies.propogate()
+
+    def near(point, spread):
+        return Point(min(max(point.x + rng.randint(-spread, spread), 0), size - 1),
+                     min(max(point.y + rng.randint(-spread, spread), 0), size - 1))
+
+    center = Point(size // 2, size // 2)
+    mock = []
+    for i in range(actors):
+        kind = i % 3
+        if kind == 0:
+            mock.append(PathObject([near(center, 10) for _ in range(path_length)]))
+        elif kind == 1:
+            mock.append(WallObject([near(center, 10) for _ in range(path_length)]))
+        else:
+            mock.append(EnemyObject(enemies, rng.choice([1, -1])))
+    game_map.mock = mock
+    units = [Unit(near(center, 3), 'Unit', inert_repel, adjacent_octile(), None, bc19_9_radius())
+             for _ in range(actors)]
+    for unit in units:
+        unit.game_map = game_map
+    game_map.active = units
+
+    cur_unit = units[0]
+    next_pos = cur_unit.next_pos() + [cur_unit.cur_pos + move for move in bc19_9_radius()]
+    visible = len(game_map.visible_units(cur_unit))
+    print("{} mock actors, {} visible units, {} positions".format(len(mock), visible, len(next_pos)))
+
+    results = {}
+    variants = (('loop', lambda: loop_potential(game_map, cur_unit, next_pos)),
+                ('vectorised', lambda: game_map.next_pos_potential(cur_unit, next_pos)))
+    for name, func in variants:
+        start_time = time.perf_counter()
+        for _ in range(repeats):
+            results[name] = func()
+        elapsed = (time.perf_counter() - start_time) / repeats
+        print("{:>10}: {:.2f} ms per call".format(name, elapsed * 1000))
+
+    for (expected, _), (score, _) in zip(results['loop'], results['vectorised']):
+        assert expected == score or (expected != expected and score != score)  # nan where +inf meets -inf
+    print("scores identical")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,236 @@
+"""
+Path finding benchmark suite. Runs every PathFinder engine with every move
+set on MovingAI maps and scenarios or on synthetic scenario sets generated with
+map_generator.generate_map, and reports throughput, node expansions and path
+cost against the optimal cost of each query.
+
+Reference costs are exact Dijkstra costs under the rules of this repository
+(corner cutting allowed) for each move set. The cost recorded in a MovingAI
+scenario file, which forbids corner cutting, is reported separately for the
+octile move set.
+
+Results are written to a JSON baseline. Comparing against an earlier baseline
+flags regressions in expansions and optimality, throughput is shown but not
+flagged as it depends on the machine.
+
+Run from the repository root:
+    python -m benchmarks.suite --baseline baseline.json
+    python -m benchmarks.suite --compare baseline.json
+    python -m benchmarks.suite --map arena.map --scen arena.map.scen
+    python -m benchmarks.suite --write-scenarios scenarios/
+"""
+import argparse
+import json
+import math
+import os
+import random
+import time
+
+import numpy as np
+import scipy.sparse.csgraph
+
+import flow_field
+from mapworks import movingai
+from mapworks.map_generator import generate_map, map_digest
+from movement_cost import diagonal_cost, euclidean_cost, linear_cost
+from moves import adjacent_linear, adjacent_octile, bc19_4_radius
+from path_finding import PathFinder
+from point import Point
+
+MOVE_SETS = {
+    'linear': (adjacent_linear(), linear_cost()),
+    'octile': (adjacent_octile(), diagonal_cost(1, math.sqrt(2))),
+    'radius4': (bc19_4_radius(), euclidean_cost()),
+}
+
+REGRESSION_TOLERANCE = 0.05  # relative increase in expansions flagged as a regression
+
+
+def synthetic_scenarios(sizes=(64, 128), densities=(0.3, 0.4), seeds=(1, 2), queries=20):
+    """
+    Generates scenario sets on Perlin maps. Start and end of every query are
+    connected under octile moves and the recorded optimal cost is the octile
+    cost with diagonal sqrt(2).
+
+    Yields:
+        (name, map_data, List[Scenario])
+    """
+    moves, cost = MOVE_SETS['octile']
+    for size in sizes:
+        for density in densities:
+            for seed in seeds:
+                name = 'perlin-{}-{}-{}'.format(size, density, seed)
+                map_data = generate_map(size, size, obstacle_density=density, seed=seed)
+                graph = flow_field.grid_graph(map_data, moves, cost)
+                free = np.flatnonzero(map_data).tolist()
+                rng = random.Random(seed)
+                scenarios = []
+                while len(scenarios) < queries:
+                    start, end = (int(cell) for cell in rng.sample(free, 2))
+                    distance = scipy.sparse.csgraph.dijkstra(graph, indices=start)[end]
+                    if not math.isfinite(distance):
+                        continue
+                    scenarios.append(movingai.Scenario(int(distance // 4), name + '.map', size, size,
+                                                       Point(start % size, start // size),
+                                                       Point(end % size, end // size), distance))
+                yield name, map_data, scenarios
+
+
+def reference_costs(map_data, moves, cost, scenarios):
+    """
+    Return:
+        List[float]: optimal cost of each scenario under moves, inf if unreachable
+    """
+    graph = flow_field.grid_graph(map_data, moves, cost)
+    width = map_data.shape[1]
+    costs = []
+    for scenario in scenarios:
+        distances = scipy.sparse.csgraph.dijkstra(graph, indices=scenario.start.y * width + scenario.start.x)
+        costs.append(float(distances[scenario.end.y * width + scenario.end.x]))
+    return costs
+
+
+def path_cost(cost, start, path):
+    return sum(cost(a, b) for a, b in zip([start] + path, path))
+
+
+def run_engine(map_data, engine, moves, cost, scenarios, references):
+    """
+    Runs the scenarios on one engine
+
+    Return:
+        Dictionary: queries, solved, throughput, expansions and optimality figures
+    """
+    height, width = map_data.shape
+
+    def is_valid(point):
+        return 0 <= point.x < width and 0 <= point.y < height and map_data[point.y, point.x]
+
+    finder = PathFinder(cost, cost, is_valid, map_data, engine)
+    max_nodes = map_data.size * len(moves)
+    expanded, elapsed, solved, missed = 0, 0.0, 0, 0
+    ratios = []
+    for scenario, reference in zip(scenarios, references):
+        start_time = time.perf_counter()
+        path = finder.find_path(moves, scenario.start, scenario.end, max_nodes)
+        elapsed += time.perf_counter() - start_time
+        expanded += finder.nodes_expanded
+        if path:
+            solved += 1
+            ratios.append(path_cost(cost, scenario.start, path) / reference if reference else 1.0)
+        elif math.isfinite(reference):
+            missed += 1
+
+    return {
+        'queries': len(scenarios),
+        'solved': solved,
+        'missed': missed,
+        'queries_per_second': len(scenarios) / elapsed if elapsed else math.inf,
+        'expansions': expanded,
+        'mean_expansions': expanded / len(scenarios) if scenarios else 0,
+        'mean_cost_ratio': sum(ratios) / len(ratios) if ratios else None,
+        'max_cost_ratio': max(ratios) if ratios else None,
+        'suboptimal': sum(ratio > 1 + 1e-9 for ratio in ratios),
+    }
+
+
+def run_map(name, map_data, scenarios, engines=PathFinder.ENGINES, move_sets=tuple(MOVE_SETS)):
+    """
+    Return:
+        Dictionary{key: results}: results of each engine and move set, keyed by map/move set/engine
+    """
+    results = {}
+    for move_set in move_sets:
+        moves, cost = MOVE_SETS[move_set]
+        references = reference_costs(map_data, moves, cost, scenarios)
+        reachable = [(scenario, reference) for scenario, reference in zip(scenarios, references)
+                     if math.isfinite(reference)]
+        if not reachable:
+            continue
+        subset, references = zip(*reachable)
+        for engine in engines:
+            key = '{}/{}/{}'.format(name, move_set, engine)
+            result = run_engine(map_data, engine, moves, cost, list(subset), list(references))
+            if move_set == 'octile':
+                recorded = [scenario.optimal for scenario in subset]
+                result['recorded_cost_ratio'] = sum(references) / sum(recorded) if sum(recorded) else None
+            result['digest'] = map_digest(map_data)
+            results[key] = result
+            print_result(key, result)
+    return results
+
+
+def print_result(key, result):
+    ratio = result['mean_cost_ratio']
+    print("{:<42} {:>4}/{:<4} {:>9.1f} q/s {:>10.1f} exp/q  cost x{}  suboptimal {}".format(
+        key, result['solved'], result['queries'], result['queries_per_second'], result['mean_expansions'],
+        '-' if ratio is None else '{:.4f}'.format(ratio), result['suboptimal']))
+
+
+def compare(results, baseline):
+    """
+    Prints changes against a baseline
+
+    Return:
+        List[str]: keys with more expansions, more suboptimal paths or fewer solved queries
+    """
+    regressions = []
+    for key, result in sorted(results.items()):
+        old = baseline.get(key)
+        if old is None or old.get('digest') != result['digest']:
+            continue
+        expansions = result['expansions'] / old['expansions'] - 1 if old['expansions'] else 0
+        throughput = result['queries_per_second'] / old['queries_per_second'] - 1
+        regressed = expansions > REGRESSION_TOLERANCE or result['suboptimal'] > old['suboptimal'] \
+            or result['solved'] < old['solved']
+        if regressed:
+            regressions.append(key)
+        print("{:<42} expansions {:+.1%}  throughput {:+.1%}{}".format(key, expansions, throughput,
+                                                                       '  REGRESSION' if regressed else ''))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--map', action='append', default=[], help='MovingAI .map file, repeatable')
+    parser.add_argument('--scen', action='append', default=[], help='MovingAI .scen file for each --map')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[64, 128])
+    parser.add_argument('--densities', type=float, nargs='+', default=[0.3, 0.4])
+    parser.add_argument('--seeds', type=int, nargs='+', default=[1, 2])
+    parser.add_argument('--queries', type=int, default=20, help='queries per synthetic map or scenario file')
+    parser.add_argument('--engines', nargs='+', default=list(PathFinder.ENGINES))
+    parser.add_argument('--move-sets', nargs='+', default=list(MOVE_SETS))
+    parser.add_argument('--baseline', help='write results to this JSON file')
+    parser.add_argument('--compare', help='compare results with this JSON baseline')
+    parser.add_argument('--write-scenarios', help='write the synthetic maps and scenarios to this directory')
+    args = parser.parse_args()
+
+    if len(args.map) != len(args.scen):
+        parser.error('every --map needs a --scen')
+    if args.map:
+        sets = [(os.path.splitext(os.path.basename(map_path))[0], movingai.load_map(map_path),
+                 movingai.load_scenarios(scen_path)[:args.queries])
+                for map_path, scen_path in zip(args.map, args.scen)]
+    else:
+        sets = synthetic_scenarios(args.sizes, args.densities, args.seeds, args.queries)
+
+    results = {}
+    for name, map_data, scenarios in sets:
+        if args.write_scenarios:
+            os.makedirs(args.write_scenarios, exist_ok=True)
+            movingai.save_map(os.path.join(args.write_scenarios, name + '.map'), map_data)
+            movingai.save_scenarios(os.path.join(args.write_scenarios, name + '.map.scen'), scenarios)
+        results.update(run_map(name, map_data, scenarios, args.engines, args.move_sets))
+
+    if args.baseline:
+        with open(args.baseline, 'w') as out:
+            json.dump(results, out, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare(results, json.load(baseline))
+        if regressions:
+            raise SystemExit("{} regressions".format(len(regressions)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Times the terrain.potential kernels against the per cell Python loops they
+replaced on Perlin maps of increasing size, and checks that both give the
+same outputs.
+
+Run from the repository root:
+    python -m benchmarks.terrain_potential
+"""
+import time
+
+import numpy as np
+import scipy.ndimage
+
+import helper
+from mapworks.map_generator import generate_map
+from terrain import potential
+
+
+def loop_goalpost(map_size, goal, xi=1 / 700):
+    """Per cell loop version of terrain.potential.goalpost before vectorisation."""
+    potn = np.zeros(map_size)
+    m, n = map_size
+    for y in range(0, m):
+        for x in range(0, n):
+            potn[y][x] = xi * ((x - goal[0]) * (x - goal[0]) + (y - goal[1]) * (y - goal[1]))
+    return potn
+
+
+def loop_manhattan(map_data, max_depth=5, return_depth_vector=False):
+    """Per cell loop version of terrain.potential.manhattan before vectorisation."""
+    temp_map = map_data * 1
+    depth_map = map_data * 0
+    current_vector = []
+    current_depth = -1
+    m, n = map_data.shape
+    for y in range(0, m):
+        for x in range(0, n):
+            if not map_data[y][x]:
+                continue
+            else:
+                nbors = helper.get_neighbors((x, y), (m, n))
+                for p in nbors:
+                    if not map_data[p[1]][p[0]]:
+                        current_vector.append((x, y))
+                        temp_map[y][x] = False
+                        depth_map[y][x] = current_depth
+                        break
+    depth_vector = [current_vector]
+    while len(current_vector) != 0:
+        current_depth -= 1
+        if current_depth == -max_depth:
+            break
+        new_vector = []
+        for point in current_vector:
+            nbors = helper.get_neighbors(point, (m, n))
+            for p in nbors:
+                if temp_map[p[1]][p[0]]:
+                    new_vector.append(p)
+                    temp_map[p[1]][p[0]] = 0
+                    depth_map[p[1]][p[0]] = current_depth
+        current_vector = new_vector
+        depth_vector.append(current_vector)
+    if len(current_vector) != 0:
+        new_vector = []
+        for y in range(0, m):
+            for x in range(0, n):
+                if depth_map[y][x] == 0 and map_data[y][x]:
+                    depth_map[y][x] = current_depth
+                    new_vector.append((x, y))
+        depth_vector.append(new_vector)
+        depth_map += 1
+    depth_map = depth_map - current_depth - 1
+    depth_vector.reverse()
+    if return_depth_vector:
+        return depth_map, depth_vector
+    else:
+        return depth_map
+
+
+def loop_distance_transform(map_data, max_depth=6):
+    """Per cell loop version of terrain.potential.distance_transform before vectorisation."""
+    d = np.ceil(scipy.ndimage.distance_transform_edt(map_data))
+    m, n = map_data.shape
+    for y in range(0, m):
+        for x in range(0, n):
+            if d[y][x] > max_depth:
+                d[y][x] = max_depth
+    return np.negative(d)
+
+
+def timed(func, *args):
+    start_time = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start_time
+
+
+def run(sizes=(64, 256, 1024), obstacle_density=0.3, seed=4):
+    print("{:>6} {:<20} {:>10} {:>12} {:>8}".format('size', 'kernel', 'loop s', 'vectorised s', 'speedup'))
+    for size in sizes:
+        map_data = generate_map(size, size, obstacle_density=obstacle_density, seed=seed)
+        goal = (size // 3, size // 2)
+        kernels = (
+            ('goalpost', loop_goalpost, potential.goalpost, (map_data.shape, goal)),
+            ('manhattan', loop_manhattan, potential.manhattan, (map_data, 5, True)),
+            ('distance_transform', loop_distance_transform, potential.distance_transform, (map_data,)),
+        )
+        for name, loop, vectorised, args in kernels:
+            expected, loop_time = timed(loop, *args)
+            result, vectorised_time = timed(vectorised, *args)
+            if name == 'manhattan':
+                assert np.array_equal(expected[0], result[0]) and expected[1] == result[1]
+            else:
+                assert np.array_equal(expected, result)
+            print("{:>6} {:<20} {:>10.4f} {:>12.4f} {:>7.0f}x".format(size, name, loop_time, vectorised_time,
+                                                                       loop_time / vectorised_time))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,122 @@
+import heapq
+import math
+
+from point import Point
+
+"""
+Bidirectional A* on a grid_search.Grid. A forward search from start and a
+backward search from end run alternately, always advancing the side with the
+smaller open list. Every time a generated node has been reached by both sides
+the best known path cost mu is updated. With a consistent heuristic the lowest
+f value of an open list is a lower bound on any path through its unexpanded
+nodes, so the search stops once mu is no larger than the bigger of the two
+lowest f values and the path through the best meeting node is optimal.
+
+The backward search walks moves in reverse, so this requires a symmetric move
+set such as the ones in moves.py.
+"""
+
+
+def is_symmetric(moves):
+    moves = set(moves)
+    return all(Point(-move.x, -move.y) in moves for move in moves)
+
+
+class _Side:
+    """Open list, scores and parents of one search direction."""
+
+    def __init__(self, grid, root, target, heuristic):
+        self.grid = grid
+        self.target = target
+        self.heuristic = heuristic
+        self.g = {root: 0}
+        self.parent = {root: root}
+        self.closed = set()
+        h = heuristic(grid.point(root))
+        self.queue = [(h, h, root)]
+        self.expanded = 0
+
+    def top_f(self):
+        queue, closed = self.queue, self.closed
+        while queue and queue[0][2] in closed:
+            heapq.heappop(queue)
+        return queue[0][0] if queue else math.inf
+
+
+def bidirectional_a_star(grid, moves, start, end, movement_cost, heuristic_cost, max_nodes):
+    """
+    Args:
+        grid (Grid): map to search on
+        moves: symmetric list of allowed moves at each point
+        start: x and y coordinates of start point
+        end: x and y coordinates of end point
+        movement_cost: real movement cost function
+        heuristic_cost: assumed movement cost function, must be symmetric
+        max_nodes: max number of valid nodes to process
+
+    Returns:
+        (store, expanded): store in the same format as generic_a_star and the
+            number of nodes expanded by both sides
+    """
+    if not (grid.contains(start) and grid.contains(end)):
+        return {}, 0
+
+    origin = Point(0, 0)
+    steps = list(zip(grid.offsets(moves), [movement_cost(origin, move) for move in moves]))
+    passable, to_point = grid.passable, grid.point
+    start_index, end_index = grid.index(start), grid.index(end)
+
+    forward = _Side(grid, start_index, end_index, lambda point: heuristic_cost(point, end))
+    backward = _Side(grid, end_index, start_index, lambda point: heuristic_cost(start, point))
+    best, meeting = math.inf, None
+    if start_index == end_index:
+        best, meeting = 0, start_index
+
+    while max_nodes > 0:
+        forward_f, backward_f = forward.top_f(), backward.top_f()
+        if best <= max(forward_f, backward_f):
+            break  # no unexpanded node can lie on a cheaper path
+        if forward_f == math.inf and backward_f == math.inf:
+            break
+
+        if backward_f == math.inf or (forward_f != math.inf and len(forward.queue) <= len(backward.queue)):
+            side, other = forward, backward
+        else:
+            side, other = backward, forward
+
+        (_, _, cur) = heapq.heappop(side.queue)
+        side.closed.add(cur)
+        side.expanded += 1
+        cur_score = side.g[cur]
+        for offset, cost in steps:
+            nxt = cur + offset
+            if not passable[nxt]:
+                continue
+            max_nodes -= 1
+            if nxt in side.closed:
+                continue
+            next_score = cur_score + cost
+            if next_score < side.g.get(nxt, math.inf):
+                side.g[nxt] = next_score
+                side.parent[nxt] = cur
+                h = side.heuristic(to_point(nxt))
+                heapq.heappush(side.queue, (next_score + h, h, nxt))
+                if nxt in other.g and next_score + other.g[nxt] < best:
+                    best, meeting = next_score + other.g[nxt], nxt
+
+    expanded = forward.expanded + backward.expanded
+    if meeting is None:
+        if max_nodes <= 0:  # exhausted nodes, end is not in store
+            return {to_point(index): (score, to_point(forward.parent[index]))
+                    for index, score in forward.g.items()}, expanded
+        return {}, expanded
+
+    store = {to_point(index): (score, to_point(forward.parent[index])) for index, score in forward.g.items()}
+    cur = meeting
+    score = forward.g[meeting]
+    while cur != end_index:
+        nxt = backward.parent[cur]
+        score += backward.g[cur] - backward.g[nxt]
+        store[to_point(nxt)] = (score, to_point(cur))
+        cur = nxt
+    return store, expanded
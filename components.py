@@ -0,0 +1,156 @@
+import numpy as np
+import scipy.ndimage
+import scipy.sparse.csgraph
+
+import flow_field
+from point import Point
+
+"""
+Connected components of the passable cells of a map for one move set. Two cells
+in different components can never reach each other, so a path query between
+them is rejected in O(1) instead of exhausting the node budget of a search.
+
+Components are weakly connected, cells are joined if either can move to the
+other. For the symmetric move sets in moves.py this is exact, for directional
+move sets it only rejects pairs that are certainly unreachable.
+"""
+
+
+class ComponentIndex:
+    """
+    Component label of every cell, -1 for impassable cells. Kept up to date
+    with update_cells. Opening a cell merges the components around it,
+    closing a cell only relabels its own component and only when it may have
+    been split.
+    """
+
+    def __init__(self, map_data, moves):
+        """
+        Args:
+            map_data: Boolean numpy array. True for passable, False for impassable.
+            moves: list of allowed moves at each point
+        """
+        self.map_data = np.array(map_data, dtype=bool)
+        self.moves = list(moves)
+        # weak connectivity, a cell is joined to cells it can reach and cells that reach it
+        self.neighbours = list(set(self.moves) | {Point(-move.x, -move.y) for move in self.moves})
+        self.labels = None
+        self.next_label = 0
+        self._nearest = {}  # label: (y, x) index arrays of the nearest cell of the component
+        self.relabel()
+
+    def relabel(self):
+        """Labels the whole map from scratch."""
+        graph = flow_field.grid_graph(self.map_data, self.neighbours, lambda start, end: 1)
+        count, labels = scipy.sparse.csgraph.connected_components(graph, directed=False)
+        self.labels = labels.reshape(self.map_data.shape)
+        self.labels[~self.map_data] = -1
+        self.next_label = count
+        self._nearest.clear()
+
+    def _contains(self, point):
+        m, n = self.map_data.shape
+        return 0 <= point.x < n and 0 <= point.y < m
+
+    def label(self, point):
+        """
+        Return:
+            int: component of point, -1 if point is impassable or outside the map
+        """
+        if not self._contains(point):
+            return -1
+        return int(self.labels[point.y, point.x])
+
+    def _start_labels(self, start):
+        # an impassable start cell, such as the cell of a unit, can still move out
+        label = self.label(start)
+        if label >= 0:
+            return {label}
+        return {self.label(start + move) for move in self.moves} - {-1}
+
+    def is_reachable(self, start, end):
+        """
+        Return:
+            bool: False if end can certainly not be reached from start
+        """
+        return start == end or self.label(end) in self._start_labels(start)
+
+    def nearest_reachable(self, start, end):
+        """
+        Closest cell to end, by straight line distance, that is in the component
+        of start. The distance transform of each component is computed once and
+        kept until the component changes.
+
+        Return:
+            Point: end if it is reachable, None if no cell is reachable from start
+        """
+        if self.is_reachable(start, end):
+            return end
+        labels = sorted(self._start_labels(start))
+        if not labels:
+            return None
+
+        best = None
+        x = min(max(end.x, 0), self.map_data.shape[1] - 1)
+        y = min(max(end.y, 0), self.map_data.shape[0] - 1)
+        for label in labels:
+            if label not in self._nearest:
+                _, indices = scipy.ndimage.distance_transform_edt(self.labels != label, return_indices=True)
+                self._nearest[label] = indices
+            (nearest_y, nearest_x) = self._nearest[label]
+            point = Point(int(nearest_x[y, x]), int(nearest_y[y, x]))
+            if best is None or point.dist(end) < best.dist(end):
+                best = point
+        return best
+
+    def update_cells(self, changes):
+        """
+        Args:
+            changes: iterable of (point, passable) pairs
+        """
+        for point, passable in changes:
+            if not self._contains(point) or self.map_data[point.y, point.x] == passable:
+                continue
+            self.map_data[point.y, point.x] = passable
+            if passable:
+                self._open(point)
+            else:
+                self._close(point)
+
+    def _neighbour_labels(self, point):
+        return {self.label(point + move) for move in self.neighbours} - {-1}
+
+    def _open(self, point):
+        labels = self._neighbour_labels(point)
+        if not labels:
+            self.labels[point.y, point.x] = self.next_label
+            self.next_label += 1
+            return
+        label = min(labels)
+        others = labels - {label}
+        if others:
+            self.labels[np.isin(self.labels, list(others))] = label
+        self.labels[point.y, point.x] = label
+        for changed in labels:
+            self._nearest.pop(changed, None)
+
+    def _close(self, point):
+        label = int(self.labels[point.y, point.x])
+        self.labels[point.y, point.x] = -1
+        self._nearest.pop(label, None)
+        if len(self._neighbour_labels(point)) == 0:
+            return  # cell was the whole component
+        if sum(self.label(point + move) >= 0 for move in self.neighbours) < 2:
+            return  # a single neighbour cannot be cut off from the rest
+
+        # relabel within the bounding box of the component only
+        (ys, xs) = np.nonzero(self.labels == label)
+        box = (slice(ys.min(), ys.max() + 1), slice(xs.min(), xs.max() + 1))
+        component = self.labels[box] == label
+        graph = flow_field.grid_graph(component, self.neighbours, lambda start, end: 1)
+        _, parts = scipy.sparse.csgraph.connected_components(graph, directed=False)
+        parts = parts.reshape(component.shape)[component]
+        # the part with the lowest label keeps the old label, others get new ones
+        _, parts = np.unique(parts, return_inverse=True)
+        self.labels[box][component] = np.where(parts == 0, label, self.next_label + parts - 1)
+        self.next_label += int(parts.max())
@@ -0,0 +1,206 @@
+import heapq
+import math
+
+from point import Point
+
+
+class ReservationTable:
+    """
+    Space-time reservations of planned units. A cell is reserved at a time step
+    and a move is reserved by the time step it arrives, so two units can neither
+    end up in the same cell nor swap cells between two time steps.
+    """
+
+    def __init__(self):
+        self.cells = {}  # (index, t): agent
+        self.moves = {}  # (from_index, to_index, t): agent
+        self.owned = {}  # agent: list of cell and move keys
+
+    def is_free(self, agent, cur, nxt, t):
+        """
+        Whether agent may move from cur to nxt, arriving at time t
+        """
+        owner = self.cells.get((nxt, t), agent)
+        if owner != agent:
+            return False
+        return self.moves.get((nxt, cur, t), agent) == agent
+
+    def is_free_after(self, agent, index, t, until):
+        """Whether index stays free of other agents from t up to until."""
+        cells = self.cells
+        return all(cells.get((index, k), agent) == agent for k in range(t, until + 1))
+
+    def reserve(self, agent, indices, t0, until):
+        """
+        Reserves a space-time path. The last cell stays reserved up to until.
+
+        Args:
+            agent: id of the unit
+            indices (List[int]): cell index at time t0, t0 + 1, ...
+            t0 (int): time of the first cell
+            until (int): last reserved time step
+        """
+        owned = self.owned.setdefault(agent, [])
+        for k, index in enumerate(indices):
+            self.cells[(index, t0 + k)] = agent
+            owned.append(('cell', (index, t0 + k)))
+            if k:
+                self.moves[(indices[k - 1], index, t0 + k)] = agent
+                owned.append(('move', (indices[k - 1], index, t0 + k)))
+        for t in range(t0 + len(indices), until + 1):
+            self.cells[(indices[-1], t)] = agent
+            owned.append(('cell', (indices[-1], t)))
+
+    def release(self, agent):
+        for kind, key in self.owned.pop(agent, []):
+            table = self.cells if kind == 'cell' else self.moves
+            if table.get(key) == agent:
+                del table[key]
+
+    def expire(self, time):
+        """Drops reservations before time."""
+        for agent, owned in self.owned.items():
+            keep = []
+            for kind, key in owned:
+                if key[-1] < time:
+                    table = self.cells if kind == 'cell' else self.moves
+                    if table.get(key) == agent:
+                        del table[key]
+                else:
+                    keep.append((kind, key))
+            owned[:] = keep
+
+
+class CooperativePlanner:
+    """
+    Windowed cooperative A* (Silver, 2005). Units are planned one after another
+    in (x, y, t) space against a shared reservation table, each plan is
+    reserved before the next unit is planned, so the resulting plans are
+    collision free for the length of the window. The heuristic is the exact
+    cost-to-go of the static map, read from the flow field of each destination,
+    which keeps the space-time search small.
+
+    Time is counted in turns. The owner of the turn loop calls step once per
+    turn so that plans made on different turns line up.
+    """
+
+    def __init__(self, path_finder, moves, window=16):
+        """
+        Args:
+            path_finder (PathFinder): path finder with map_data, gives the grid,
+                movement cost and flow fields
+            moves: list of allowed moves at each point
+            window (int): number of turns planned and reserved ahead
+        """
+        if path_finder.grid is None:
+            raise ValueError("cooperative planning requires map_data")
+        self.path_finder = path_finder
+        self.grid = path_finder.grid
+        self.moves = list(moves)
+        self.window = window
+        self.time = 0
+        self.reservations = ReservationTable()
+
+        origin = Point(0, 0)
+        costs = [path_finder.movement_cost(origin, move) for move in moves]
+        self.steps = list(zip(self.grid.offsets(moves), costs)) + [(0, min(costs))]  # last step waits
+        self.nodes_expanded = 0
+
+    def step(self, turns=1):
+        """Advances time and drops reservations in the past."""
+        self.time += turns
+        self.reservations.expire(self.time)
+
+    def plan(self, agents):
+        """
+        Plans a batch of units in the given priority order. Units that will not
+        move, because they are at their destination or cannot reach it, are
+        planned first so others route around them.
+
+        Args:
+            agents: list of (agent id, start point, destination) tuples
+
+        Return:
+            Dictionary{agent id: List[Point]}: position for each of the next turns,
+                repeated positions are waits
+        """
+        for agent, _, _ in agents:
+            self.reservations.release(agent)
+        agents = sorted(agents, key=lambda agent: not self._is_stationary(agent[1], agent[2]))
+        return {agent: self._plan(agent, start, end) for agent, start, end in agents}
+
+    def _is_stationary(self, start, end):
+        if start == end or not (self.grid.contains(start) and self.grid.contains(end)):
+            return True
+        return self.path_finder.flow_field(self.moves, end).cost_at(start) == math.inf
+
+    def replan(self, agent, start, end):
+        """
+        Plans a single unit against the reservations of all other units
+
+        Return:
+            List[Point]: position for each of the next turns
+        """
+        self.reservations.release(agent)
+        return self._plan(agent, start, end)
+
+    def _plan(self, agent, start, end):
+        grid, reservations = self.grid, self.reservations
+        passable, to_point = grid.passable, grid.point
+        field = self.path_finder.flow_field(self.moves, end)
+        cost_to_go = field.cost
+        t0, horizon = self.time, self.time + self.window
+
+        def h(index):
+            point = to_point(index)
+            return cost_to_go[point.y, point.x]
+
+        start_index, end_index = grid.index(start), grid.index(end)
+        if not grid.contains(start) or not grid.contains(end) or h(start_index) == math.inf:
+            reservations.reserve(agent, [start_index], t0, horizon)
+            return [start] * self.window
+
+        root = (start_index, t0)
+        g = {root: 0}
+        parent = {root: None}
+        queue = [(h(start_index), 0, root)]
+        goal = None
+        while queue:
+            (_, _, state) = heapq.heappop(queue)
+            (cur, t) = state
+            if cur == end_index and reservations.is_free_after(agent, cur, t, horizon):
+                goal = state
+                break
+            if t == horizon:
+                goal = state  # window exhausted, best node towards destination
+                break
+
+            self.nodes_expanded += 1
+            cur_score = g[state]
+            for offset, cost in self.steps:
+                nxt = cur + offset
+                if not passable[nxt] and nxt != start_index:
+                    continue
+                if not reservations.is_free(agent, cur, nxt, t + 1):
+                    continue
+                if cur == end_index and offset == 0:
+                    cost = 0  # waiting at the destination is free
+                next_state = (nxt, t + 1)
+                next_score = cur_score + cost
+                if next_score < g.get(next_state, math.inf):
+                    g[next_state] = next_score
+                    parent[next_state] = state
+                    heapq.heappush(queue, (next_score + h(nxt), -(t + 1), next_state))
+
+        if goal is None:  # boxed in, stay in place
+            reservations.reserve(agent, [start_index], t0, horizon)
+            return [start] * self.window
+
+        indices = []
+        state = goal
+        while state is not None:
+            indices.append(state[0])
+            state = parent[state]
+        indices.reverse()
+        reservations.reserve(agent, indices, t0, horizon)
+        return [to_point(index) for index in indices[1:]]
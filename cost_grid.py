@@ -0,0 +1,100 @@
+import numpy as np
+
+"""
+Per cell movement cost. Entering a cell costs the geometric cost of the move
+times the cost of the cell, which is the product of any number of named
+multiplicative layers such as mud, a terrain.potential.coulomb field or
+pheromone threat.
+
+Heuristics from movement_cost.py stay admissible as long as every cell cost
+is at least 1, which holds for layers built with a weight.
+"""
+
+
+class CostGrid:
+    """
+    Product of named layers, kept as one numpy array. Changing a layer only
+    recomputes the cells whose value changed and passes exactly those cells
+    to the subscribed listeners, so path finders can keep flat copies in sync
+    without rebuilding them.
+    """
+
+    def __init__(self, shape):
+        """
+        Args:
+            shape: (m, n) shape of the map
+        """
+        self.shape = tuple(shape)
+        self.layers = {}  # name: numpy array of multipliers
+        self.cost = np.ones(self.shape)
+        self.listeners = []
+        self._cells = np.arange(self.cost.size).reshape(self.shape)  # flat index of every cell
+
+    def subscribe(self, listener):
+        """
+        Args:
+            listener: called with (ys, xs, costs) numpy arrays of the changed cells
+        """
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def set_layer(self, name, values, weight=None):
+        """
+        Adds or replaces a layer
+
+        Args:
+            name: layer name
+            values: numpy array of map shape
+            weight: if given the layer is 1 + weight * values, with negative values
+                such as obstacles in a pheromone map clipped to 0. Otherwise values are
+                used as multipliers as they are
+        """
+        values = np.asarray(values, dtype=float)
+        if values.shape != self.shape:
+            raise ValueError("layer shape {} does not match map shape {}".format(values.shape, self.shape))
+        if weight is not None:
+            values = 1 + weight * np.clip(values, 0, None)
+
+        old = self.layers.get(name)
+        self.layers[name] = values.copy()
+        changed = values != 1 if old is None else values != old
+        self._update(np.nonzero(changed))
+
+    def update_layer(self, name, region, values):
+        """
+        Changes part of a layer
+
+        Args:
+            name: layer name
+            region: numpy index of the changed cells, such as a tuple of slices
+            values: multipliers of the cells in region
+        """
+        layer = self.layers[name]
+        (ys, xs) = np.divmod(self._cells[region].ravel(), self.shape[1])
+        before = layer[ys, xs]
+        layer[region] = values
+        changed = layer[ys, xs] != before
+        self._update((ys[changed], xs[changed]))
+
+    def remove_layer(self, name):
+        old = self.layers.pop(name)
+        self._update(np.nonzero(old != 1))
+
+    def _update(self, cells):
+        (ys, xs) = cells
+        if not len(ys):
+            return
+        cost = np.ones(len(ys))
+        for layer in self.layers.values():
+            cost *= layer[ys, xs]
+        self.cost[ys, xs] = cost
+        for listener in self.listeners:
+            listener(ys, xs, cost)
+
+    def cost_at(self, point):
+        return self.cost[point.y, point.x]
+
+    def min_cost(self):
+        return float(self.cost.min())
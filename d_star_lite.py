@@ -0,0 +1,206 @@
+import heapq
+import math
+
+from point import Point
+
+
+class DStarLite:
+    """
+    Incremental planner (Koenig and Likhachev, D* Lite) for one unit and one
+    destination. The search runs backwards from the destination so its state
+    stays valid while the unit moves. When cells change only vertices whose
+    cost to the destination is affected are expanded again, so the cost of a
+    repair depends on the size of the change and not the size of the map.
+
+    Passable cells are read from a grid_search.Grid which is shared with the
+    PathFinder that created the planner, only the search state is per planner.
+    """
+
+    def __init__(self, grid, moves, start, end, movement_cost, heuristic_cost, max_nodes):
+        """
+        Args:
+            grid (Grid): map shared with the path finder
+            moves: list of allowed moves at each point
+            start (Point): current position of the unit
+            end (Point): destination
+            movement_cost: real movement cost function
+            heuristic_cost: assumed movement cost function
+            max_nodes (int): max number of nodes expanded by a single repair
+        """
+        self.grid = grid
+        self.heuristic_cost = heuristic_cost
+        self.max_nodes = max_nodes
+        origin = Point(0, 0)
+        offsets = grid.offsets(moves)
+        costs = [movement_cost(origin, move) for move in moves]
+        self.successors = list(zip(offsets, costs))
+        self.predecessors = [(-offset, cost) for offset, cost in self.successors]
+
+        self.start = grid.index(start)
+        self.end = grid.index(end)
+        self.end_point = end
+        self.last = self.start
+        self.km = 0
+        self.g = {}
+        self.rhs = {self.end: 0}
+        self.open_keys = {}
+        self.queue = []
+        self.pending = set()
+        self.nodes_expanded = 0
+        self._push(self.end)
+
+    def _h(self, index):
+        return self.heuristic_cost(self.grid.point(self.start), self.grid.point(index))
+
+    def _key(self, index):
+        score = min(self.g.get(index, math.inf), self.rhs.get(index, math.inf))
+        return score + self._h(index) + self.km, score
+
+    def _push(self, index):
+        key = self._key(index)
+        self.open_keys[index] = key
+        heapq.heappush(self.queue, (key, index))
+
+    def _top(self):
+        """Removes stale queue entries and returns the top entry, None when empty."""
+        while self.queue:
+            (key, index) = self.queue[0]
+            if self.open_keys.get(index) == key:
+                return key, index
+            heapq.heappop(self.queue)
+        return None
+
+    def _update_vertex(self, index):
+        passable = self.grid.passable
+        if index != self.end:
+            best = math.inf
+            if passable[index] or index == self.start:  # a unit can always leave its own cell
+                g = self.g
+                for offset, cost in self.successors:
+                    nxt = index + offset
+                    if passable[nxt]:
+                        score = cost + g.get(nxt, math.inf)
+                        if score < best:
+                            best = score
+            self.rhs[index] = best
+
+        self.open_keys.pop(index, None)
+        if self.g.get(index, math.inf) != self.rhs.get(index, math.inf):
+            self._push(index)
+
+    def _compute(self):
+        g, rhs = self.g, self.rhs
+        budget = self.max_nodes
+        while budget > 0:
+            top = self._top()
+            start_key = self._key(self.start)
+            if top is None or (top[0] >= start_key and rhs.get(self.start, math.inf) == g.get(self.start, math.inf)):
+                return
+            (key_old, index) = top
+            key_new = self._key(index)
+            if key_old < key_new:
+                self._push(index)
+                continue
+
+            heapq.heappop(self.queue)
+            del self.open_keys[index]
+            budget -= 1
+            self.nodes_expanded += 1
+            if g.get(index, math.inf) > rhs.get(index, math.inf):
+                g[index] = rhs[index]
+                for offset, _ in self.predecessors:
+                    self._update_vertex(index + offset)
+            else:
+                g[index] = math.inf
+                self._update_vertex(index)
+                for offset, _ in self.predecessors:
+                    self._update_vertex(index + offset)
+
+    def notify(self, changes):
+        """
+        Applies changed cells to the shared grid and records them, the search
+        is repaired on the next query. Has the same signature as
+        PathFinder.update_cells so either or both can be subscribed to
+        game_map.Map changes.
+
+        Args:
+            changes: iterable of (point, passable) pairs
+        """
+        for point, passable in changes:
+            if self.grid.contains(point):
+                self.grid.set_passable(point, passable)
+                self.pending.add(self.grid.index(point))
+
+    def move_to(self, point):
+        """
+        Updates the current position of the unit
+
+        Args:
+            point (Point): new position
+        """
+        self.start = self.grid.index(point)
+
+    def _repair(self):
+        if self.pending:
+            self.km += self._h(self.last)
+            self.last = self.start
+            for index in self.pending:
+                self._update_vertex(index)
+                for offset, _ in self.predecessors:
+                    self._update_vertex(index + offset)
+            self.pending.clear()
+        self._compute()
+
+    def cost(self):
+        """
+        Return:
+            cost from current position to destination, inf if unreachable
+        """
+        self._repair()
+        return self.g.get(self.start, math.inf)
+
+    def next_step(self):
+        """
+        Return:
+            Point: next step towards destination, None if the unit is at the
+                destination or the destination cannot be reached
+        """
+        self._repair()
+        step = self._best_successor(self.start)
+        return None if step is None else self.grid.point(step)
+
+    def path(self, max_len=None):
+        """
+        Follows the current search from the unit position to the destination
+
+        Args:
+            max_len (int): maximum number of steps returned
+
+        Return:
+            List[Point]: List of points to take to reach end in the forward direction
+        """
+        self._repair()
+        path = []
+        seen = {self.start}
+        cur = self.start
+        while cur != self.end and (max_len is None or len(path) < max_len):
+            cur = self._best_successor(cur)
+            if cur is None or cur in seen:  # unreachable or search stopped by max_nodes
+                return []
+            seen.add(cur)
+            path.append(self.grid.point(cur))
+        return path
+
+    def _best_successor(self, index):
+        if index == self.end or self.g.get(index, math.inf) == math.inf:
+            return None
+
+        passable, g = self.grid.passable, self.g
+        best, best_score = None, math.inf
+        for offset, cost in self.successors:
+            nxt = index + offset
+            if passable[nxt]:
+                score = cost + g.get(nxt, math.inf)
+                if score < best_score:
+                    best, best_score = nxt, score
+        return best
@@ -0,0 +1,182 @@
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.csgraph
+
+from point import Point
+
+
+class FlowField:
+    """
+    Cost-to-go from every cell of the map to a single destination together with
+    the best move out of every cell. Any number of units heading for the same
+    destination read their next step from it in constant time.
+    """
+
+    def __init__(self, dest, moves, cost, direction):
+        """
+        Args:
+            dest (Point): destination of the field
+            moves: list of allowed moves at each point
+            cost: float numpy array of map shape, cost to reach dest, inf if unreachable
+            direction: int numpy array of map shape, index into moves of the best
+                move, -1 at dest and at unreachable cells
+        """
+        self.dest = dest
+        self.moves = list(moves)
+        self.cost = cost
+        self.direction = direction
+
+    def cost_at(self, point):
+        return self.cost[point.y, point.x]
+
+    def next_step(self, point):
+        """
+        Return:
+            Point: next step towards dest, None at dest or when dest is unreachable
+        """
+        move = self.direction[point.y, point.x]
+        if move < 0:
+            return None
+        return point + self.moves[move]
+
+    def path(self, point):
+        """
+        Return:
+            List[Point]: List of points to take to reach dest in the forward direction
+        """
+        path = []
+        step = self.next_step(point)
+        while step is not None:
+            path.append(step)
+            step = self.next_step(step)
+        return path
+
+
+def _shifted(values, move, fill):
+    """
+    Array where each cell holds the value of the cell at offset move, fill
+    where the offset leaves the map.
+    """
+    m, n = values.shape
+    shifted = np.full_like(values, fill)
+    src_y = slice(max(move.y, 0), m + min(move.y, 0))
+    src_x = slice(max(move.x, 0), n + min(move.x, 0))
+    dst_y = slice(max(-move.y, 0), m + min(-move.y, 0))
+    dst_x = slice(max(-move.x, 0), n + min(-move.x, 0))
+    shifted[dst_y, dst_x] = values[src_y, src_x]
+    return shifted
+
+
+def grid_graph(map_data, moves, movement_cost):
+    """
+    Sparse adjacency matrix of the map for a move set. Cell (x, y) is vertex
+    y * n + x and there is an edge for every move between two passable cells.
+
+    Args:
+        map_data: Boolean numpy array. True for passable, False for impassable.
+        moves: list of allowed moves at each point
+        movement_cost: real movement cost function, evaluated once per move
+
+    Return:
+        scipy.sparse.csr_matrix: weighted directed graph
+    """
+    map_data = np.asarray(map_data, dtype=bool)
+    m, n = map_data.shape
+    origin = Point(0, 0)
+    index = np.arange(m * n).reshape(m, n)
+
+    rows, cols, data = [], [], []
+    for move in moves:
+        target_passable = _shifted(map_data, move, False)
+        target_index = _shifted(index, move, -1)
+        edge = map_data & target_passable
+        rows.append(index[edge])
+        cols.append(target_index[edge])
+        data.append(np.full(np.count_nonzero(edge), movement_cost(origin, move), dtype=float))
+
+    return scipy.sparse.csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                                   shape=(m * n, m * n))
+
+
+def compute_flow_field(map_data, moves, dest, movement_cost):
+    """
+    Computes the flow field for a destination. The grid graph is built with
+    numpy and the cost-to-go comes from a single Dijkstra search from dest over
+    the reversed graph with scipy.sparse.csgraph. Best moves are found with one
+    vectorised argmin over all moves.
+
+    Movement cost is assumed to depend only on the offset of a move.
+
+    Args:
+        map_data: Boolean numpy array. True for passable, False for impassable.
+        moves: list of allowed moves at each point
+        dest (Point): destination
+        movement_cost: real movement cost function
+
+    Return:
+        FlowField: field for dest
+    """
+    map_data = np.asarray(map_data, dtype=bool)
+    m, n = map_data.shape
+    origin = Point(0, 0)
+    costs = [movement_cost(origin, move) for move in moves]
+    graph = grid_graph(map_data, moves, movement_cost)
+    cost_to_go = np.full((m, n), np.inf)
+    if 0 <= dest.x < n and 0 <= dest.y < m and map_data[dest.y, dest.x]:
+        # cost from every cell to dest is the cost from dest in the reversed graph
+        cost_to_go = scipy.sparse.csgraph.dijkstra(graph.T.tocsr(), indices=dest.y * n + dest.x).reshape(m, n)
+
+    scores = np.stack([cost + _shifted(cost_to_go, move, np.inf) for move, cost in zip(moves, costs)])
+    direction = np.argmin(scores, axis=0).astype(np.int8)
+    best = np.min(scores, axis=0)
+    direction[~np.isfinite(best) | ~np.isfinite(cost_to_go) | ~map_data] = -1
+    if 0 <= dest.x < n and 0 <= dest.y < m:
+        direction[dest.y, dest.x] = -1
+    return FlowField(dest, moves, cost_to_go, direction)
+
+
+class FlowFieldCache:
+    """
+    Flow fields of one map, cached per (move set, destination) with least
+    recently used eviction. Any change to the map drops all fields as the
+    cost-to-go of every cell may depend on it.
+    """
+
+    def __init__(self, map_data, movement_cost, max_size=32):
+        """
+        Args:
+            map_data: Boolean numpy array. True for passable, False for impassable.
+            movement_cost: real movement cost function
+            max_size (int): maximum number of fields kept
+        """
+        self.map_data = np.array(map_data, dtype=bool)
+        self.movement_cost = movement_cost
+        self.max_size = max_size
+        self.fields = OrderedDict()
+
+    def field(self, moves, dest):
+        """
+        Return:
+            FlowField: cached or newly computed field for dest
+        """
+        key = (tuple(moves), dest)
+        if key in self.fields:
+            self.fields.move_to_end(key)
+            return self.fields[key]
+
+        field = compute_flow_field(self.map_data, moves, dest, self.movement_cost)
+        self.fields[key] = field
+        while len(self.fields) > self.max_size:
+            self.fields.popitem(last=False)
+        return field
+
+    def update_cells(self, changes):
+        """
+        Args:
+            changes: iterable of (point, passable) pairs
+        """
+        for point, passable in changes:
+            self.map_data[point.y, point.x] = passable
+        self.fields.clear()
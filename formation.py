@@ -13,7 +13,8 @@ class Formation:
     destination on each turn.
     """
 
-    def __init__(self, index, rel_pos, leader_pos, units, is_valid_pos):
+    def __init__(self, index, rel_pos, leader_pos, units, is_valid_pos, map_data=None, engine='generic',
+                 cache=None, planner=None):
         """
         Formation object is unique to each unit.
 
@@ -23,15 +24,22 @@ class Formation:
             leader_pos (Point): leader position
             units (List[Point]): unit positions
             is_valid_pos (func): function to determine if postion is valid
+            map_data: Boolean numpy array, required by array based path finding engines
+            engine (str): path finding engine, see PathFinder.ENGINES
+            cache (PathCache): path cache shared by the units of the formation
+            planner (CooperativePlanner): optional planner shared by the units of the
+                formation, unit paths are then planned collision free in space-time
         """
         self.index = index
         self.units = units
         self.leader = leader_pos
         self.rel_pos = rel_pos
         self.is_valid_pos = is_valid_pos
-        self.path_finder = PathFinder(diagonal_cost(), diagonal_cost(), self.is_valid_pos)
+        self.path_finder = PathFinder(diagonal_cost(), diagonal_cost(), self.is_valid_pos, map_data, engine,
+                                      cache=cache)
         self.moves = adjacent_octile()
         self.dest = None
+        self.planner = planner
 
     def update_units(self, units, leader_pos):
         """
@@ -67,8 +75,33 @@ class Formation:
             src (Point): source point
             dest (Point): destination point
         """
+        if self.planner is not None:
+            return self.planner.replan(self.index, src, dest)
         return self.path_finder.find_path(self.moves, src, dest)
 
+    def plan_squad(self, positions, dests):
+        """
+        Plans paths for all units of the formation in one batch with the shared
+        cooperative planner. Units are planned in index order.
+
+        Args:
+            positions (List[Point]): current position of each unit
+            dests (List[Point]): destination of each unit
+
+        Return:
+            List[List[Point]]: collision free path of each unit
+        """
+        agents = [(i, pos, dest) for i, (pos, dest) in enumerate(zip(positions, dests))]
+        plans = self.planner.plan(agents)
+        return [plans[i] for i in range(len(agents))]
+
+    def tick(self):
+        """
+        Advances the cooperative planner by one turn, called once per turn by the leader
+        """
+        if self.planner is not None:
+            self.planner.step()
+
     def predict_pos_from(self, pos):
         """
         Predict position of unit from given point. Takes into account
@@ -79,7 +112,12 @@ class Formation:
             pos (Point): destination point
         """
         possible_pos = pos + self.rel_pos[self.index]
-        store = self.path_finder.generic_a_star(self.moves, pos, possible_pos, 30)
+        if self.path_finder.grid is not None:
+            # walled off positions are replaced by the closest reachable cell
+            possible_pos = self.path_finder.reachable_goal(self.moves, pos, possible_pos)
+            if possible_pos is None:
+                return None
+        store = self.path_finder.search(self.moves, pos, possible_pos, 30)
         score_points = [(possible_pos.dist(pos), pos) for pos in store.keys()]
         if score_points:
             return min(score_points)[1]
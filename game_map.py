@@ -1,10 +1,141 @@
+import numpy as np
+
+import potential_engine
+import spatial_hash
+
+
 class Map:
+    FREE = -1  # occupancy of a cell without a unit
 
     def __init__(self, map_data):
         self.static = map_data
-        self.active = []
+        self.occupancy = np.full(np.shape(map_data), Map.FREE, dtype=np.int32)  # unit id of every cell
+        self.unit_ids = {}  # unit: id, index in active
+        self._active = []
+        self.spatial = spatial_hash.SpatialHash()  # active units by position
         self.mock = []
         self.special = {}
+        self.listeners = []
+        self.occupancy_listeners = []
+
+    @property
+    def active(self):
+        return self._active
+
+    @active.setter
+    def active(self, units):
+        """
+        Replaces the active units and rebuilds the occupancy grid. Units report
+        their own moves afterwards, see move_unit.
+        """
+        units = list(units)
+        changed = [unit.cur_pos for unit in self._active] + [unit.cur_pos for unit in units]
+        self._active = units
+        self.unit_ids = {unit: unit_id for unit_id, unit in enumerate(self._active)}
+        self.occupancy.fill(Map.FREE)
+        self.spatial.clear()
+        for unit, unit_id in self.unit_ids.items():
+            self.spatial.insert(unit, unit.cur_pos)
+            if self.contains(unit.cur_pos):
+                self.occupancy[unit.cur_pos.y, unit.cur_pos.x] = unit_id
+        self._occupancy_changed(changed)
+
+    def add_unit(self, unit):
+        self.unit_ids[unit] = len(self._active)
+        self._active.append(unit)
+        self.move_unit(unit, None, unit.cur_pos)
+
+    def move_unit(self, unit, old_pos, new_pos):
+        """
+        Updates the occupancy grid and spatial hash for a single unit move, called by the unit
+        whenever its position changes. Units that are not active are ignored.
+
+        Args:
+            unit (Unit): moving unit
+            old_pos (Point): previous position, None if the unit was not on the map
+            new_pos (Point): new position, None if the unit left the map
+        """
+        unit_id = self.unit_ids.get(unit)
+        if unit_id is None:
+            return
+        if self.contains(old_pos) and self.occupancy[old_pos.y, old_pos.x] == unit_id:
+            self.occupancy[old_pos.y, old_pos.x] = Map.FREE
+        if self.contains(new_pos):
+            self.occupancy[new_pos.y, new_pos.x] = unit_id
+        self.spatial.move(unit, new_pos)
+        if old_pos != new_pos:
+            self._occupancy_changed([old_pos, new_pos])
+
+    def _occupancy_changed(self, cells):
+        if self.occupancy_listeners:
+            cells = [pos for pos in cells if self.contains(pos)]
+            for listener in self.occupancy_listeners:
+                listener(cells)
+
+    def contains(self, pos):
+        if pos is None:
+            return False
+        m, n = self.occupancy.shape
+        return 0 <= pos.x < n and 0 <= pos.y < m
+
+    def unit_at(self, pos):
+        """
+        Return:
+            Unit: active unit at pos, None if the cell is free
+        """
+        if not self.contains(pos):
+            return None
+        unit_id = self.occupancy[pos.y, pos.x]
+        return None if unit_id == Map.FREE else self._active[unit_id]
+
+    def valid_grid(self):
+        """
+        Return:
+            Boolean numpy array of cells that are passable and unoccupied, the
+                array form of is_valid_point for array based path finding
+        """
+        return np.asarray(self.static, dtype=bool) & (self.occupancy == Map.FREE)
+
+    def subscribe(self, listener):
+        """
+        Registers a function that is called with the list of (point, passable)
+        changes whenever static cells change, e.g. PathFinder.update_cells or
+        DStarLite.notify
+
+        Args:
+            listener (func): function taking a list of changes
+        """
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def subscribe_occupancy(self, listener):
+        """
+        Registers a function that is called with the list of cells whose
+        occupancy may have changed whenever units move, e.g. PathCache.invalidate
+        for a cache of path finders that check is_valid_point
+
+        Args:
+            listener (func): function taking a list of points
+        """
+        self.occupancy_listeners.append(listener)
+
+    def unsubscribe_occupancy(self, listener):
+        self.occupancy_listeners.remove(listener)
+
+    def set_cells(self, changes):
+        """
+        Changes static cells and notifies listeners
+
+        Args:
+            changes: iterable of (point, passable) pairs
+        """
+        changes = [(pos, bool(passable)) for pos, passable in changes]
+        for pos, passable in changes:
+            self.static[pos.y][pos.x] = passable
+        for listener in self.listeners:
+            listener(changes)
 
     def is_valid_point(self, pos):
         """
@@ -14,33 +145,56 @@ class Map:
         Args:
             pos (Point): position to check
         """
-        return 0 <= pos.x < 100 and 0 <= pos.y < 100 and self.static[pos.y][pos.x] and all(lambda x: x.cur_pos != pos for x in self.active)
+        m, n = self.occupancy.shape
+        return 0 <= pos.x < n and 0 <= pos.y < m and self.static[pos.y][pos.x] and \
+            self.occupancy[pos.y, pos.x] == Map.FREE
 
     def valid_next_pos(self, cur_unit):
         return [pos for pos in cur_unit.next_pos() if self.is_valid_point(pos)]
 
     def visible_units(self, cur_unit):
-        return [unit for unit in self.active if cur_unit.can_see(unit)]
+        """
+        Return:
+            List[Unit]: active units in sight of cur_unit, in the order of active
+        """
+        units = self.spatial.visible(cur_unit.cur_pos, cur_unit.sight)
+        return sorted(units, key=self.unit_ids.__getitem__)
 
-    def _poten(self, next_pos, actors):
-        poten = [0] * len(next_pos)
+    def units_within(self, pos, radius):
+        """
+        Return:
+            List[Unit]: active units with euclidean distance to pos of at most radius,
+                in the order of active
+        """
+        return sorted(self.spatial.within_radius(pos, radius), key=self.unit_ids.__getitem__)
 
-        for i, pos in enumerate(next_pos):
-            for actor in actors:
-                poten[i] += actor.poten_at(pos)
+    def visibility_matrix(self):
+        """
+        Visibility between all active units for the turn
+
+        Return:
+            Boolean numpy array, [i, j] is True if active unit i sees active unit j
+        """
+        return spatial_hash.visibility_matrix([unit.cur_pos for unit in self.active],
+                                              [unit.sight for unit in self.active])
 
-        return poten
+    def _poten(self, next_pos, actors):
+        return potential_engine.evaluate(actors, next_pos)
 
     def mock_poten(self, next_pos):
-        return self._poten(next_pos, self.mock)
+        return self._poten(next_pos, self.mock).tolist()
 
     def active_poten(self, cur_unit, next_pos):
         active_units = self.visible_units(cur_unit)
-        return self._poten(next_pos, active_units)
+        return self._poten(next_pos, active_units).tolist()
 
     def next_pos_potential(self, cur_unit, next_pos):
-        mock_poten = self.mock_poten(next_pos)
-        active_poten = self.active_poten(cur_unit, next_pos)
+        """
+        Scores every position against mock objects and visible units with the
+        vectorised kernels of potential_engine
+        """
+        mock_poten = self._poten(next_pos, self.mock)
+        active_poten = self._poten(next_pos, self.visible_units(cur_unit))
         # total_poten = [max(a, b) for a, b in zip(mock_poten, total_poten)]
-        total_poten = [a + b for a, b in zip(mock_poten, active_poten)]
+        total_poten = (mock_poten + active_poten).tolist()
         return [(score, pos) for score, pos in zip(total_poten, next_pos)]
@@ -0,0 +1,261 @@
+import heapq
+import math
+
+import numpy as np
+
+import priority_queue
+from point import Point
+
+
+class Grid:
+    """
+    Flat, padded view of a boolean map used by the array backed search
+    engines. Cells are addressed by a single integer index instead of a
+    Point, and the map is surrounded by a border of impassable cells so
+    that neighbour indices never need a bounds check.
+
+    Working arrays for g-score, parent and closed state are allocated
+    once per grid and only the entries touched by a query are reset
+    afterwards, so a query does not pay for the size of the map.
+    """
+
+    def __init__(self, map_data, pad=3):
+        """
+        Args:
+            map_data: Boolean numpy array. True for passable, False for impassable.
+            pad (int): width of impassable border, must be at least the largest
+                offset of any move set that will be searched on this grid
+        """
+        self.height, self.width = map_data.shape
+        self.pad = pad
+        self.stride = self.width + 2 * pad
+        self.size = self.stride * (self.height + 2 * pad)
+
+        padded = np.zeros((self.height + 2 * pad, self.stride), dtype=bool)
+        padded[pad:pad + self.height, pad:pad + self.width] = map_data
+        self.passable = padded.ravel().tolist()
+
+        self.g_score = [math.inf] * self.size
+        self.parent = [-1] * self.size
+        self.closed = [False] * self.size
+        self.touched = []
+
+    def map_data(self):
+        """
+        Current passable cells as a boolean numpy array with the shape of the map
+        """
+        padded = np.array(self.passable, dtype=bool).reshape(-1, self.stride)
+        return padded[self.pad:self.pad + self.height, self.pad:self.pad + self.width]
+
+    def flatten(self, values, fill):
+        """
+        Flat, padded list of another array with the same shape as the map, so it
+        can be indexed with the cell indices of this grid.
+
+        Args:
+            values: numpy array with the shape of the map
+            fill: value of cells in the border
+        """
+        padded = np.full((self.height + 2 * self.pad, self.stride), fill, dtype=values.dtype)
+        padded[self.pad:self.pad + self.height, self.pad:self.pad + self.width] = values
+        return padded.ravel().tolist()
+
+    def index(self, point):
+        return (point.y + self.pad) * self.stride + point.x + self.pad
+
+    def point(self, index):
+        y, x = divmod(index, self.stride)
+        return Point(x - self.pad, y - self.pad)
+
+    def contains(self, point):
+        return 0 <= point.x < self.width and 0 <= point.y < self.height
+
+    def is_passable(self, point):
+        return self.contains(point) and self.passable[self.index(point)]
+
+    def set_passable(self, point, passable):
+        """
+        Update a single cell, used when the map changes during a match.
+        """
+        self.passable[self.index(point)] = bool(passable)
+
+    def offsets(self, moves):
+        """
+        Converts a move set into flat index offsets.
+
+        Raises:
+            ValueError: if a move reaches further than the padding
+        """
+        reach = max(max(abs(move.x), abs(move.y)) for move in moves)
+        if reach > self.pad:
+            raise ValueError("moves reach {} cells but grid is padded by {}".format(reach, self.pad))
+        return [move.y * self.stride + move.x for move in moves]
+
+    def reset(self):
+        """
+        Reset working arrays touched by the previous query.
+        """
+        g_score, parent, closed = self.g_score, self.parent, self.closed
+        for index in self.touched:
+            g_score[index] = math.inf
+            parent[index] = -1
+            closed[index] = False
+        self.touched = []
+
+    def store(self):
+        """
+        Converts the working arrays of the last query into the dictionary store
+        returned by PathFinder.generic_a_star, {point: (score, parent)}.
+        """
+        point, g_score, parent = self.point, self.g_score, self.parent
+        store = {}
+        for index in self.touched:
+            store[point(index)] = (g_score[index], point(parent[index]))
+        return store
+
+
+def array_a_star(grid, moves, start, end, movement_cost, heuristic_cost, max_nodes, open_list=None,
+                 cell_costs=None):
+    """
+    A* search on a Grid. Open list is a heap of (f, h, index) tuples with lazy
+    deletion of stale entries, closed set and scores live in the preallocated
+    grid arrays.
+
+    Movement cost is assumed to depend only on the offset of a move, so it is
+    evaluated once per move instead of once per neighbour. The heuristic is
+    evaluated once per generated cell.
+
+    Note: validity is read from the grid and not from an is_valid_move function
+
+    Args:
+        grid (Grid): map to search on
+        moves: list of allowed moves at each point
+        start: x and y coordinates of start point
+        end: x and y coordinates of end point
+        movement_cost: real movement cost function
+        heuristic_cost: assumed movement cost function
+        max_nodes: max number of valid nodes to process
+        open_list: class of the open list, such as priority_queue.IndexedHeap or
+            priority_queue.BucketQueue. None uses an inline heapq list with lazy deletion
+        cell_costs: flat padded list of per cell cost multipliers, see Grid.flatten. The
+            cost of a move is its movement cost times the multiplier of the cell it enters
+
+    Returns:
+        (store, expanded): store in the same format as generic_a_star and
+            the number of nodes expanded
+    """
+    if not grid.contains(start):
+        return {}, 0
+    if open_list is not None or cell_costs is not None:
+        queue = (open_list or priority_queue.HeapQueue)()
+        return _queued_a_star(grid, moves, start, end, movement_cost, heuristic_cost, max_nodes, queue,
+                              cell_costs)
+
+    origin = Point(0, 0)
+    steps = list(zip(grid.offsets(moves), [movement_cost(origin, move) for move in moves]))
+    passable, g_score, parent, closed = grid.passable, grid.g_score, grid.parent, grid.closed
+    to_point = grid.point
+    heappush, heappop = heapq.heappush, heapq.heappop
+
+    grid.reset()
+    touched = grid.touched
+    start_index = grid.index(start)
+    end_index = grid.index(end)
+    h_score = {}
+
+    g_score[start_index] = 0
+    parent[start_index] = start_index
+    touched.append(start_index)
+    h_start = heuristic_cost(start, end)
+    queue = [(h_start, h_start, start_index)]
+    expanded = 0
+
+    while queue:
+        (_, _, cur) = heappop(queue)
+        if closed[cur]:
+            continue
+        if cur == end_index or max_nodes <= 0:
+            return grid.store(), expanded  # return store on reaching end or when exhausted nodes
+
+        closed[cur] = True
+        expanded += 1
+        cur_score = g_score[cur]
+        for offset, cost in steps:
+            nxt = cur + offset
+            if not passable[nxt]:
+                continue
+            max_nodes -= 1
+            if closed[nxt]:
+                continue
+            next_score = cur_score + cost
+            if next_score < g_score[nxt]:
+                if parent[nxt] == -1:
+                    touched.append(nxt)
+                    h_score[nxt] = heuristic_cost(to_point(nxt), end)
+                g_score[nxt] = next_score
+                parent[nxt] = cur
+                h = h_score[nxt]
+                heappush(queue, (next_score + h, h, nxt))
+
+    return {}, expanded
+
+
+def _queued_a_star(grid, moves, start, end, movement_cost, heuristic_cost, max_nodes, queue, cell_costs=None):
+    """
+    array_a_star on an open list object, see priority_queue.HeapQueue,
+    priority_queue.IndexedHeap and priority_queue.BucketQueue. Ties in f are
+    broken on h where the open list supports tuple priorities. Move costs are
+    scaled by cell_costs of the entered cell when given.
+    """
+    origin = Point(0, 0)
+    steps = list(zip(grid.offsets(moves), [movement_cost(origin, move) for move in moves]))
+    passable, g_score, parent, closed = grid.passable, grid.g_score, grid.parent, grid.closed
+    to_point = grid.point
+    # bucket queues only order by integer f, there is no room for a tie breaker
+    tie_break = not hasattr(queue, 'buckets')
+    push, pop = queue.push, queue.pop
+
+    grid.reset()
+    touched = grid.touched
+    start_index = grid.index(start)
+    end_index = grid.index(end)
+    h_score = {}
+
+    g_score[start_index] = 0
+    parent[start_index] = start_index
+    touched.append(start_index)
+    h_start = heuristic_cost(start, end)
+    push((h_start, h_start) if tie_break else h_start, start_index)
+    expanded = 0
+
+    while queue:
+        (_, cur) = pop()
+        if closed[cur]:
+            continue  # stale entry of an open list without decrease-key
+        if cur == end_index or max_nodes <= 0:
+            return grid.store(), expanded  # return store on reaching end or when exhausted nodes
+
+        closed[cur] = True
+        expanded += 1
+        cur_score = g_score[cur]
+        for offset, cost in steps:
+            nxt = cur + offset
+            if not passable[nxt]:
+                continue
+            max_nodes -= 1
+            if closed[nxt]:
+                continue
+            if cell_costs is None:
+                next_score = cur_score + cost
+            else:
+                next_score = cur_score + cost * cell_costs[nxt]
+            if next_score < g_score[nxt]:
+                if parent[nxt] == -1:
+                    touched.append(nxt)
+                    h_score[nxt] = heuristic_cost(to_point(nxt), end)
+                g_score[nxt] = next_score
+                parent[nxt] = cur
+                h = h_score[nxt]
+                push((next_score + h, h) if tie_break else next_score + h, nxt)
+
+    return {}, expanded
@@ -0,0 +1,266 @@
+import heapq
+import math
+
+from collections import deque
+
+import grid_search
+from point import Point
+
+
+class HierarchicalPathFinder:
+    """
+    HPA* style planner on top of the zones found by TerrainAnalyzer. Gate points
+    between each pair of zones are grouped into entrances, 8-connected runs of
+    gate points, and each entrance is represented by its middle tile. Costs
+    between the entrances of a zone are precomputed with searches restricted
+    to the zone, which gives a small abstract graph.
+
+    A query searches the abstract graph from start to end and returns a
+    HierarchicalPath that refines one segment at a time with the low level
+    PathFinder, so a unit can start moving as soon as the first segment is known.
+    """
+
+    def __init__(self, analyzer, path_finder, moves):
+        """
+        Args:
+            analyzer (TerrainAnalyzer): analyzed map
+            path_finder (PathFinder): low level path finder used to refine segments,
+                its movement cost also gives the precomputed entrance costs
+            moves: list of allowed moves at each point
+        """
+        self.analyzer = analyzer
+        self.path_finder = path_finder
+        self.moves = moves
+        self.grid = grid_search.Grid(analyzer.map_data)
+        self.zone_cells = self.grid.flatten(analyzer.zone_map, -1)
+
+        origin = Point(0, 0)
+        self.steps = list(zip(self.grid.offsets(moves), [path_finder.movement_cost(origin, move) for move in moves]))
+
+        self.entrances = []  # representative point of each entrance
+        self.zone_entrances = {zone.zone_id: [] for zone in analyzer.zones}
+        self.zone_gates = {zone.zone_id: set() for zone in analyzer.zones}
+        self.edges = {}  # entrance: [(entrance, cost)]
+        self._find_entrances()
+        self._link_entrances()
+
+    def _find_entrances(self):
+        """Group gate points of each pair of zones into entrances."""
+        for zone in self.analyzer.zones:
+            for adj_zone_id, gate_points in zone.entry_points.items():
+                adj_zone_id = int(adj_zone_id)
+                gates = {Point(int(x), int(y)) for x, y in gate_points}
+                indices = {self.grid.index(gate) for gate in gates}
+                self.zone_gates[zone.zone_id] |= indices
+                self.zone_gates[adj_zone_id] |= indices
+                if adj_zone_id < zone.zone_id:
+                    continue  # entrances of a pair are added once
+
+                for run in _connected_runs(gates):
+                    center_x = sum(point.x for point in run) / len(run)
+                    center_y = sum(point.y for point in run) / len(run)
+                    rep = min(run, key=lambda point: (point.x - center_x) ** 2 + (point.y - center_y) ** 2)
+                    entrance = len(self.entrances)
+                    self.entrances.append(rep)
+                    self.edges[entrance] = []
+                    self.zone_entrances[zone.zone_id].append(entrance)
+                    self.zone_entrances[adj_zone_id].append(entrance)
+
+    def _link_entrances(self):
+        """Precompute costs between entrances of the same zone."""
+        for zone_id, entrances in self.zone_entrances.items():
+            for entrance in entrances:
+                costs = self._zone_costs(zone_id, self.entrances[entrance], entrances)
+                self.edges[entrance].extend((other, cost) for other, cost in costs.items() if other != entrance)
+
+    def _zone_costs(self, zone_id, source, entrances):
+        """
+        Dijkstra search from source restricted to a zone and its gate points
+
+        Args:
+            zone_id (int): zone to search in
+            source (Point): start point inside the zone
+            entrances (List[int]): entrances to find costs for
+
+        Return:
+            Dictionary{entrance: cost}: cost to each reachable entrance
+        """
+        targets = {}
+        for entrance in entrances:
+            targets.setdefault(self.grid.index(self.entrances[entrance]), []).append(entrance)
+
+        zone_cells, gates, steps = self.zone_cells, self.zone_gates[zone_id], self.steps
+        source = self.grid.index(source)
+        dist = {source: 0}
+        queue = [(0, source)]
+        costs = {}
+        remaining = len(targets)
+        while queue and remaining:
+            (cur_score, cur) = heapq.heappop(queue)
+            if cur_score > dist[cur]:
+                continue
+            if cur in targets:
+                remaining -= 1
+                for entrance in targets[cur]:
+                    costs[entrance] = cur_score
+            for offset, cost in steps:
+                nxt = cur + offset
+                if zone_cells[nxt] != zone_id and nxt not in gates:
+                    continue
+                next_score = cur_score + cost
+                if next_score < dist.get(nxt, math.inf):
+                    dist[nxt] = next_score
+                    heapq.heappush(queue, (next_score, nxt))
+        return costs
+
+    def zone_of(self, point):
+        if not self.grid.contains(point):
+            return -1
+        return self.zone_cells[self.grid.index(point)]
+
+    def abstract_path(self, start, end):
+        """
+        Search the entrance graph from start to end
+
+        Args:
+            start (Point): start point
+            end (Point): end point
+
+        Return:
+            (List[Point], cost): entrances to pass through followed by end, and the
+                estimated cost. Points outside any zone and points in the same zone
+                give [end] with the heuristic cost. Empty list when end is not reachable
+        """
+        start_zone, end_zone = self.zone_of(start), self.zone_of(end)
+        heuristic_cost = self.path_finder.heuristic_cost
+        if start_zone == -1 or end_zone == -1 or start_zone == end_zone:
+            return [end], heuristic_cost(start, end)
+
+        exits = self._zone_costs(end_zone, end, self.zone_entrances[end_zone])
+        store = {}
+        queue = []
+        for entrance, cost in self._zone_costs(start_zone, start, self.zone_entrances[start_zone]).items():
+            store[entrance] = (cost, None)
+            heapq.heappush(queue, (cost + heuristic_cost(self.entrances[entrance], end), entrance))
+
+        end_node = -1
+        while queue:
+            (_, cur) = heapq.heappop(queue)
+            if cur == end_node:
+                break
+            cur_score = store[cur][0]
+            successors = list(self.edges[cur])
+            if cur in exits:
+                successors.append((end_node, exits[cur]))
+            for nxt, cost in successors:
+                next_score = cur_score + cost
+                if nxt not in store or next_score < store[nxt][0]:
+                    store[nxt] = (next_score, cur)
+                    h = 0 if nxt == end_node else heuristic_cost(self.entrances[nxt], end)
+                    heapq.heappush(queue, (next_score + h, nxt))
+
+        if end_node not in store:
+            return [], math.inf
+
+        waypoints = [end]
+        (cost, cur) = store[end_node]
+        while cur is not None:
+            waypoints.append(self.entrances[cur])
+            cur = store[cur][1]
+        waypoints.reverse()
+        return waypoints, cost
+
+    def plan(self, start, end):
+        """
+        Plans a path from start to end that is refined lazily
+
+        Return:
+            HierarchicalPath: path that yields steps in the forward direction
+        """
+        waypoints, cost = self.abstract_path(start, end)
+        return HierarchicalPath(self.path_finder, self.moves, start, waypoints, cost)
+
+    def find_path(self, start, end):
+        """
+        Takes start and end point and returns the fully refined list of points
+        indicating path in the forward direction
+        """
+        return list(self.plan(start, end))
+
+
+class HierarchicalPath:
+    """
+    Path through a list of waypoints where only the segment up to the next
+    waypoint is searched for, on demand.
+    """
+
+    def __init__(self, path_finder, moves, start, waypoints, cost):
+        self.path_finder = path_finder
+        self.moves = moves
+        self.position = start  # point up to which the path has been refined
+        self.waypoints = deque(waypoints)
+        self.cost = cost
+        self.steps = deque()
+
+    def refine(self):
+        """
+        Searches the segment up to the next waypoint and appends it to steps.
+        If a segment cannot be found the remaining waypoints are dropped.
+
+        Return:
+            bool: False when there are no segments left to refine
+        """
+        if not self.waypoints:
+            return False
+
+        target = self.waypoints.popleft()
+        if target == self.position:
+            return True
+
+        segment = self.path_finder.find_path(self.moves, self.position, target)
+        if not segment:
+            self.waypoints.clear()
+            return False
+
+        self.steps.extend(segment)
+        self.position = target
+        return True
+
+    def next_step(self):
+        """
+        Return:
+            Point: next step, None when the end has been reached or cannot be reached
+        """
+        while not self.steps and self.refine():
+            pass
+        return self.steps.popleft() if self.steps else None
+
+    def __iter__(self):
+        step = self.next_step()
+        while step is not None:
+            yield step
+            step = self.next_step()
+
+    def __bool__(self):
+        return bool(self.steps or self.waypoints)
+
+
+def _connected_runs(points):
+    """Split a set of points into 8-connected groups."""
+    remaining = set(points)
+    runs = []
+    while remaining:
+        seed = remaining.pop()
+        run = [seed]
+        queue = deque([seed])
+        while queue:
+            cur = queue.popleft()
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    nxt = Point(cur.x + dx, cur.y + dy)
+                    if nxt in remaining:
+                        remaining.remove(nxt)
+                        run.append(nxt)
+                        queue.append(nxt)
+        runs.append(run)
+    return runs
@@ -0,0 +1,158 @@
+import json
+import time
+
+"""
+Opt-in search instrumentation. A PathFinder only looks at its instrumentation
+attribute once per query, so nothing is measured and almost nothing is paid
+while it is None.
+
+When enabled, the array engine runs on a counting open list, which is what
+provides the push, pop, generated and open list size counters. Other engines
+only report the counters they already keep and leave the rest as None.
+Counting open lists are slower than the inline heap of the array engine, so
+wall times are comparable between instrumented runs only.
+"""
+
+METRICS = ('nodes_expanded', 'nodes_generated', 'pushes', 'pops', 'max_open', 'store_size', 'path_length',
+           'time_us')
+
+
+def counting(open_list, stats):
+    """
+    Subclass of an open list class that counts its operations into stats
+
+    Args:
+        open_list: open list class with push(priority, item) and pop()
+        stats (Dictionary): receives pushes, pops, nodes_generated and max_open
+    """
+    for key in ('pushes', 'pops', 'nodes_generated', 'max_open'):
+        stats[key] = 0
+    seen = set()
+
+    class Counting(open_list):
+        def push(self, priority, item):
+            stats['pushes'] += 1
+            if item not in seen:
+                seen.add(item)
+                stats['nodes_generated'] += 1
+            changed = super().push(priority, item)
+            if len(self) > stats['max_open']:
+                stats['max_open'] = len(self)
+            return changed
+
+        def pop(self):
+            stats['pops'] += 1
+            return super().pop()
+
+    Counting.__name__ = 'Counting' + open_list.__name__
+    return Counting
+
+
+class Histogram:
+    """Count, sum, max and power of two buckets of a non-negative metric."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets = {}  # upper bound: count
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        bound = 1 << int(value).bit_length() if value >= 1 else 0
+        self.buckets[bound] = self.buckets.get(bound, 0) + 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'mean': self.total / self.count if self.count else 0,
+            'max': self.max,
+            'buckets': {'<{}'.format(bound) if bound else '0': count
+                        for bound, count in sorted(self.buckets.items())},
+        }
+
+
+class Instrumentation:
+    """
+    Collects one record per path query from any number of path finders and
+    aggregates them into histograms per unit and per turn. Attach it with
+    PathFinder.instrument and call next_turn from the turn loop.
+    """
+
+    def __init__(self, keep_records=True):
+        """
+        Args:
+            keep_records (bool): keep the individual query records as well
+        """
+        self.keep_records = keep_records
+        self.turn = 0
+        self.records = []
+        self.per_unit = {}  # unit: {metric: Histogram}
+        self.per_turn = {}  # turn: {metric: Histogram}
+        self.current = None  # record of the query in progress
+
+    def next_turn(self):
+        self.turn += 1
+
+    def begin(self, unit, engine):
+        """
+        Starts the record of a query
+
+        Return:
+            Dictionary: record filled in by the path finder
+        """
+        self.current = dict.fromkeys(METRICS)
+        self.current.update(unit=unit, turn=self.turn, engine=engine, start=time.perf_counter())
+        return self.current
+
+    def end(self, store, expanded, path_length):
+        """Completes the record of the query in progress and aggregates it."""
+        record, self.current = self.current, None
+        record['time_us'] = (time.perf_counter() - record.pop('start')) * 1e6
+        record['nodes_expanded'] = expanded
+        record['store_size'] = len(store)
+        record['path_length'] = path_length
+        if self.keep_records:
+            self.records.append(record)
+        for groups, key in ((self.per_unit, record['unit']), (self.per_turn, record['turn'])):
+            histograms = groups.setdefault(key, {})
+            for metric in METRICS:
+                if record[metric] is not None:
+                    histograms.setdefault(metric, Histogram()).add(record[metric])
+        return record
+
+    def summary(self):
+        """
+        Return:
+            Dictionary: per_unit and per_turn histograms of every metric
+        """
+        def convert(groups):
+            return {str(key): {metric: histogram.to_dict() for metric, histogram in histograms.items()}
+                    for key, histograms in groups.items()}
+
+        return {'queries': sum(histograms['time_us'].count for histograms in self.per_turn.values()),
+                'per_unit': convert(self.per_unit),
+                'per_turn': convert(self.per_turn)}
+
+    def dump(self, path, records=False):
+        """
+        Writes the summary as JSON
+
+        Args:
+            path: output file path
+            records (bool): include the individual query records
+        """
+        data = self.summary()
+        if records:
+            data['records'] = self.records
+        with open(path, 'w') as out:
+            json.dump(data, out, indent=2, default=str)
+
+    def reset(self):
+        self.records = []
+        self.per_unit = {}
+        self.per_turn = {}
+        self.current = None
@@ -0,0 +1,208 @@
+import heapq
+
+from moves import adjacent_octile
+from point import Point
+
+"""
+Jump Point Search (Harabor and Grastien, 2011) for uniform cost octile grids.
+Symmetric paths are pruned by only expanding jump points, cells where a path
+is forced to change direction because of an obstacle. Moves may cut corners,
+a diagonal step is valid whenever its destination is passable, which matches
+the validity check done by generic_a_star.
+
+The search runs on a grid_search.Grid and the resulting store is filled in
+cell by cell along the final path, so it can be read by
+PathFinder._get_path_from_store like any other store.
+"""
+
+OCTILE_MOVES = frozenset(adjacent_octile())
+
+
+def is_octile(moves):
+    return frozenset(moves) == OCTILE_MOVES
+
+
+def _jump_straight(passable, stride, cur, dx, dy, end):
+    """
+    Walks from cur in a linear direction until a jump point is found.
+
+    Return:
+        int: number of steps to the jump point, 0 if the walk hits an obstacle
+    """
+    if dx:
+        step, side = dx, stride
+    else:
+        step, side = dy * stride, 1
+
+    steps = 0
+    while True:
+        cur += step
+        steps += 1
+        if not passable[cur]:
+            return 0
+        if cur == end:
+            return steps
+        if (not passable[cur + side] and passable[cur + side + step]) or \
+                (not passable[cur - side] and passable[cur - side + step]):
+            return steps
+
+
+def _jump(passable, stride, cur, dx, dy, end):
+    """
+    Walks from cur in the given direction until a jump point is found. A diagonal
+    walk stops at any cell from which a linear walk finds a jump point.
+
+    Return:
+        int: number of steps to the jump point, 0 if the walk hits an obstacle
+    """
+    if not (dx and dy):
+        return _jump_straight(passable, stride, cur, dx, dy, end)
+
+    step = dy * stride + dx
+    vertical = dy * stride
+    steps = 0
+    while True:
+        cur += step
+        steps += 1
+        if not passable[cur]:
+            return 0
+        if cur == end:
+            return steps
+        if (not passable[cur - dx] and passable[cur - dx + vertical]) or \
+                (not passable[cur - vertical] and passable[cur + dx - vertical]):
+            return steps
+        if _jump_straight(passable, stride, cur, dx, 0, end) or _jump_straight(passable, stride, cur, 0, dy, end):
+            return steps
+
+
+def _directions(passable, stride, cur, heading):
+    """
+    Pruned set of directions to search from cur, given the direction it was
+    reached from. Start point has no heading and searches all directions.
+    """
+    if heading is None:
+        return [(move.x, move.y) for move in adjacent_octile()]
+
+    dx, dy = heading
+    if dx and dy:
+        vertical = dy * stride
+        directions = [(dx, 0), (0, dy), (dx, dy)]
+        if not passable[cur - dx]:
+            directions.append((-dx, dy))
+        if not passable[cur - vertical]:
+            directions.append((dx, -dy))
+    elif dx:
+        directions = [(dx, 0)]
+        if not passable[cur + stride]:
+            directions.append((dx, 1))
+        if not passable[cur - stride]:
+            directions.append((dx, -1))
+    else:
+        directions = [(0, dy)]
+        if not passable[cur + 1]:
+            directions.append((1, dy))
+        if not passable[cur - 1]:
+            directions.append((-1, dy))
+    return directions
+
+
+def _path_store(grid, end_index, step_cost):
+    """
+    Store of all jump points, with cells along the path from start to end
+    linked cell by cell so the full path can be read from it.
+    """
+    store = grid.store()
+    g_score, parent, to_point = grid.g_score, grid.parent, grid.point
+
+    cur = end_index
+    while parent[cur] != cur:
+        prev = parent[cur]
+        cur_point, prev_point = to_point(cur), to_point(prev)
+        dx = (cur_point.x > prev_point.x) - (cur_point.x < prev_point.x)
+        dy = (cur_point.y > prev_point.y) - (cur_point.y < prev_point.y)
+        move = Point(dx, dy)
+        cost = step_cost[(dx, dy)]
+        score = g_score[prev]
+        link = prev_point
+        while link != cur_point:
+            next_link = link + move
+            score += cost
+            store[next_link] = (score, link)
+            link = next_link
+        store[cur_point] = (g_score[cur], cur_point - move)
+        cur = prev
+    return store
+
+
+def jump_point_search(grid, start, end, movement_cost, heuristic_cost, max_nodes):
+    """
+    Jump point search on a Grid with octile moves. Costs between jump points are
+    the per step cost of the direction times the number of steps.
+
+    Args:
+        grid (Grid): map to search on
+        start: x and y coordinates of start point
+        end: x and y coordinates of end point
+        movement_cost: real movement cost function
+        heuristic_cost: assumed movement cost function
+        max_nodes: max number of jump points to generate
+
+    Returns:
+        (store, expanded): store in the same format as generic_a_star and
+            the number of nodes expanded
+    """
+    if not grid.contains(start):
+        return {}, 0
+
+    origin = Point(0, 0)
+    step_cost = {(move.x, move.y): movement_cost(origin, move) for move in adjacent_octile()}
+    passable, g_score, parent, closed = grid.passable, grid.g_score, grid.parent, grid.closed
+    stride, to_point = grid.stride, grid.point
+    heappush, heappop = heapq.heappush, heapq.heappop
+
+    grid.reset()
+    touched = grid.touched
+    start_index = grid.index(start)
+    end_index = grid.index(end)
+    heading = {start_index: None}
+    h_score = {}
+
+    g_score[start_index] = 0
+    parent[start_index] = start_index
+    touched.append(start_index)
+    h_start = heuristic_cost(start, end)
+    queue = [(h_start, h_start, start_index)]
+    expanded = 0
+
+    while queue:
+        (_, _, cur) = heappop(queue)
+        if closed[cur]:
+            continue
+        if cur == end_index:
+            return _path_store(grid, end_index, step_cost), expanded
+        if max_nodes <= 0:
+            return grid.store(), expanded  # exhausted nodes, end is not in store
+
+        closed[cur] = True
+        expanded += 1
+        cur_score = g_score[cur]
+        for dx, dy in _directions(passable, stride, cur, heading[cur]):
+            steps = _jump(passable, stride, cur, dx, dy, end_index)
+            if not steps:
+                continue
+            max_nodes -= 1
+            nxt = cur + steps * (dy * stride + dx)
+            if closed[nxt]:
+                continue
+            next_score = cur_score + steps * step_cost[(dx, dy)]
+            if next_score < g_score[nxt]:
+                if parent[nxt] == -1:
+                    touched.append(nxt)
+                    h_score[nxt] = heuristic_cost(to_point(nxt), end)
+                g_score[nxt] = next_score
+                parent[nxt] = cur
+                heading[nxt] = (dx, dy)
+                h = h_score[nxt]
+                heappush(queue, (next_score + h, h, nxt))
+
+    return {}, expanded
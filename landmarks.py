@@ -0,0 +1,144 @@
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse.csgraph
+
+import flow_field
+from mapworks.map_generator import map_digest
+
+"""
+ALT heuristic (A*, landmarks and the triangle inequality, Goldberg and
+Harrelson). Exact distances from a few landmark cells to every cell are
+precomputed once per map. For any landmark L the triangle inequality gives
+|d(L, a) - d(L, b)| <= d(a, b), so the largest such difference is an admissible
+and consistent heuristic that, unlike the geometric costs in movement_cost.py,
+knows about obstacles.
+
+Distances are only symmetric for symmetric move sets, which is what all the
+move sets in moves.py are.
+"""
+
+
+def select_landmarks(graph, shape, count, seed_cell=None):
+    """
+    Farthest point selection. The first landmark is the cell farthest from seed_cell,
+    every following landmark is the reachable cell farthest from all landmarks so far.
+
+    Args:
+        graph: sparse grid graph from flow_field.grid_graph
+        shape: (m, n) shape of the map
+        count (int): number of landmarks
+        seed_cell (int): flat index of a passable cell, the first passable cell if None
+
+    Return:
+        (landmarks, distances): flat landmark indices and float32 array of shape
+            (count, m, n) with the distance from each landmark to every cell
+    """
+    if seed_cell is None:
+        degree = np.diff(graph.indptr)
+        seed_cell = int(np.argmax(degree > 0))
+
+    seed = scipy.sparse.csgraph.dijkstra(graph, indices=seed_cell)
+    seed[~np.isfinite(seed)] = -1
+    landmarks = [int(np.argmax(seed))]
+    distances = [scipy.sparse.csgraph.dijkstra(graph, indices=landmarks[0])]
+    nearest = distances[0].copy()
+    while len(landmarks) < count:
+        candidates = np.where(np.isfinite(nearest), nearest, -1)
+        cell = int(np.argmax(candidates))
+        if candidates[cell] <= 0:
+            break  # every reachable cell already is a landmark
+        landmarks.append(cell)
+        distances.append(scipy.sparse.csgraph.dijkstra(graph, indices=cell))
+        nearest = np.minimum(nearest, distances[-1])
+
+    m, n = shape
+    return landmarks, np.stack(distances).astype(np.float32).reshape(-1, m, n)
+
+
+class LandmarkHeuristic:
+    """
+    Drop-in heuristic_cost for PathFinder backed by landmark distances.
+
+    Heuristic values are looked up from tables of every cell against a
+    target, each built with a single numpy operation. The last few tables are
+    kept, and on a miss the table is built for the argument that stayed fixed
+    since the previous miss. Either argument may be the fixed one, so forward
+    calls h(point, end) and backward calls h(start, point) of a bidirectional
+    search both hit after one table per endpoint.
+    """
+
+    TABLES = 4  # tables kept, at least both endpoints of a query
+
+    def __init__(self, landmarks, distances, digest=None, base=None):
+        """
+        Args:
+            landmarks (List[int]): flat cell index of each landmark
+            distances: float32 numpy array of shape (count, m, n)
+            digest (str): fingerprint of the map the distances belong to
+            base: optional geometric heuristic, the larger of both values is used
+        """
+        self.landmarks = list(landmarks)
+        self.distances = distances
+        self.digest = digest
+        self.base = base
+        self.tables = OrderedDict()  # target: table, least recently used first
+        self.last_miss = None  # (start, end) of the previous lookup without a table
+
+    @classmethod
+    def build(cls, map_data, moves, movement_cost, count=8, base=None):
+        """
+        Args:
+            map_data: Boolean numpy array. True for passable, False for impassable.
+            moves: symmetric list of allowed moves at each point
+            movement_cost: real movement cost function
+            count (int): number of landmarks
+            base: optional geometric heuristic combined with the landmark bound
+        """
+        graph = flow_field.grid_graph(map_data, moves, movement_cost)
+        landmarks, distances = select_landmarks(graph, map_data.shape, count)
+        return cls(landmarks, distances, map_digest(map_data), base)
+
+    def save(self, path):
+        np.savez_compressed(path, landmarks=np.array(self.landmarks), distances=self.distances,
+                            digest=np.array(self.digest))
+
+    @classmethod
+    def load(cls, path, base=None):
+        with np.load(path) as data:
+            return cls(data['landmarks'].tolist(), data['distances'], str(data['digest']), base)
+
+    def table_for(self, target):
+        """
+        Landmark lower bound from every cell to target
+
+        Return:
+            List[List[float]]: nested list indexed [y][x], inf if target is not
+                reachable from the cell
+        """
+        target_dist = self.distances[:, target.y, target.x][:, None, None]
+        with np.errstate(invalid='ignore'):
+            bound = np.abs(self.distances - target_dist)
+        # cells with no landmark in reach on either side only know bound 0
+        bound[np.isnan(bound)] = 0
+        return bound.max(axis=0).astype(float).tolist()
+
+    def __call__(self, start, end):
+        tables = self.tables
+        if end in tables:
+            value = tables[end][start.y][start.x]
+        elif start in tables:
+            value = tables[start][end.y][end.x]
+        else:
+            # the argument that repeats between misses is the fixed endpoint of the search
+            target, other = (start, end) if self.last_miss is not None and self.last_miss[0] == start \
+                else (end, start)
+            self.last_miss = (start, end)
+            tables[target] = self.table_for(target)
+            if len(tables) > self.TABLES:
+                tables.popitem(last=False)
+            value = tables[target][other.y][other.x]
+
+        if self.base is not None:
+            return max(value, self.base(start, end))
+        return value
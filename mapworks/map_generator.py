@@ -1,3 +1,5 @@
+import hashlib
+
 import numpy as np
 
 
@@ -61,3 +63,12 @@ def gradient(h, x, y):
     vectors = np.array([[0, 1], [0, -1], [1, 0], [-1, 0]])
     g = vectors[h % 4]
     return g[:, :, 0] * x + g[:, :, 1] * y
+
+
+def map_digest(map_data):
+    """Fingerprint of a map, stored with preprocessed data to detect a stale file
+    a) map_data:        Boolean numpy array. True for passable, False for impassable.
+    b) return value:    Hex digest string.
+    """
+    map_data = np.ascontiguousarray(map_data, dtype=bool)
+    return hashlib.sha1(map_data.tobytes() + str(map_data.shape).encode()).hexdigest()
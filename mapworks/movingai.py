@@ -0,0 +1,79 @@
+from collections import namedtuple
+
+import numpy as np
+
+from point import Point
+
+"""
+Readers and writers for the map and scenario formats of the MovingAI grid
+benchmarks (Sturtevant, 2012), https://movingai.com/benchmarks/formats.html
+
+Note: reference costs in MovingAI scenario files are octile distances with
+diagonal cost sqrt(2) where diagonal moves may not cut corners
+"""
+
+PASSABLE = frozenset('.GS')
+
+Scenario = namedtuple('Scenario', ['bucket', 'map_name', 'width', 'height', 'start', 'end', 'optimal'])
+
+
+def load_map(path):
+    """Load a .map file
+    a) path:            Path of the .map file.
+    b) return value:    Boolean numpy array. True for passable, False for impassable.
+    """
+    with open(path) as lines:
+        header = {}
+        for line in lines:
+            line = line.strip()
+            if line == 'map':
+                break
+            key, value = line.split(maxsplit=1)
+            header[key] = value
+        height, width = int(header['height']), int(header['width'])
+        rows = [line.rstrip('\n') for line in lines][:height]
+
+    return np.array([[cell in PASSABLE for cell in row[:width]] for row in rows], dtype=bool)
+
+
+def save_map(path, map_data):
+    """Write a .map file
+    a) path:            Path of the .map file.
+    b) map_data:        Boolean numpy array. True for passable, False for impassable.
+    """
+    height, width = map_data.shape
+    with open(path, 'w') as out:
+        out.write('type octile\nheight {}\nwidth {}\nmap\n'.format(height, width))
+        for row in map_data:
+            out.write(''.join('.' if cell else '@' for cell in row) + '\n')
+
+
+def load_scenarios(path):
+    """Load a .scen file
+    a) path:            Path of the .scen file.
+    b) return value:    List of Scenario tuples, start and end are Points.
+    """
+    scenarios = []
+    with open(path) as lines:
+        for line in lines:
+            fields = line.split()
+            if len(fields) != 9:
+                continue  # version line
+            bucket, map_name, width, height, start_x, start_y, end_x, end_y, optimal = fields
+            scenarios.append(Scenario(int(bucket), map_name, int(width), int(height),
+                                      Point(int(start_x), int(start_y)), Point(int(end_x), int(end_y)),
+                                      float(optimal)))
+    return scenarios
+
+
+def save_scenarios(path, scenarios):
+    """Write a .scen file
+    a) path:            Path of the .scen file.
+    b) scenarios:       List of Scenario tuples.
+    """
+    with open(path, 'w') as out:
+        out.write('version 1\n')
+        for scenario in scenarios:
+            out.write('{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{:.8f}\n'.format(
+                scenario.bucket, scenario.map_name, scenario.width, scenario.height,
+                scenario.start.x, scenario.start.y, scenario.end.x, scenario.end.y, scenario.optimal))
@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 
 class PathObject:
     """
@@ -34,6 +36,21 @@ class PathObject:
         scores = [score(path_point, i, pos) for i, path_point in enumerate(self.points)]
         return min(scores)
 
+    def poten_many(self, xs, ys, slope=-2, cutoff=4):
+        """
+        Vectorised poten_at for numpy arrays of x and y coordinates, one row
+        of scores per path point
+        """
+        if not self.points:
+            raise ValueError("potential of an empty path")
+        index = np.arange(len(self.points))[:, None]
+        path = np.array([(point.x, point.y) for point in self.points])
+        dist = (xs[None, :] - path[:, 0:1]) ** 2 + (ys[None, :] - path[:, 1:2]) ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = (index + 1) * ((1 / dist - 1 / cutoff) * (slope - index))
+        scores[dist == 0] = -math.inf
+        return scores.min(axis=0)
+
 
 class WallObject:
     """
@@ -60,12 +77,20 @@ class WallObject:
         else:
             return 0
 
+    def poten_many(self, xs, ys):
+        """Vectorised poten_at for numpy arrays of x and y coordinates"""
+        walls = np.array([(point.x, point.y) for point in self.points]).reshape(-1, 2)
+        hit = ((xs[:, None] == walls[:, 0]) & (ys[:, None] == walls[:, 1])).any(axis=1)
+        return np.where(hit, math.inf, 0.0)
+
 class EnemyObject:
     """
     Enemy objects exert a attraction/repulsion based on the proximity/probability of enemies 
     Enemy objects can be initialized so that they can either attract or repel based on multiplier (default:repel)
     """
 
+    numpy_scalars = True  # poten_at returns numpy scalars of the pheromone map dtype
+
     def __init__(self, pheromone, multiplier=1):
         self.pheromone = pheromone
         self.multiplier = multiplier
@@ -81,4 +106,11 @@ class EnemyObject:
             value: potential due to enemies
         """
         return (self.pheromone.map[pos.y][pos.x] + self.pheromone.obstacleData[pos.y][pos.x])*self.multiplier
+
+    def poten_many(self, xs, ys):
+        """
+        Vectorised poten_at for numpy arrays of x and y coordinates. Values keep
+        the dtype of the pheromone map like the numpy scalars of poten_at.
+        """
+        return (self.pheromone.map[ys, xs] + self.pheromone.obstacleData[ys, xs])*self.multiplier
         
@@ -1,8 +1,16 @@
+import functools
 import random
 
 import math
 
+"""
+Factories of the geometric cost functions are memoized, so equal arguments
+return the same function object. This lets path finders that were
+created separately share cached paths.
+"""
 
+
+@functools.lru_cache(maxsize=None)
 def linear_cost(scale=1):
     """
     Manhattan distance, only linear movement is allowed
@@ -24,6 +32,7 @@ def linear_cost(scale=1):
     return cost
 
 
+@functools.lru_cache(maxsize=None)
 def euclidean_cost(scale=1):
     """
     Euclidean distance, linear and diagonal movement is allowed,
@@ -46,6 +55,7 @@ def euclidean_cost(scale=1):
     return cost
 
 
+@functools.lru_cache(maxsize=None)
 def diagonal_cost(lin=1, diag=1):
     """
     Diagonal distance, 8 directions.
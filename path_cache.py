@@ -0,0 +1,108 @@
+from collections import OrderedDict
+
+
+class PathCache:
+    """
+    Bounded least recently used cache of paths that can be shared by many
+    PathFinder objects. Keys are built by the path finder and contain start,
+    end, move set, cost functions and map version. Each cached path is indexed
+    by the cells it passes through, so a change to the map only evicts the
+    paths that cross a changed cell.
+
+    Note: a cell that becomes passable does not evict anything, cached paths
+    remain valid although a shorter path might now exist. The same holds for
+    cells freed by units when the cache follows Map.subscribe_occupancy
+    """
+
+    def __init__(self, max_size=1024):
+        """
+        Args:
+            max_size (int): maximum number of paths kept
+        """
+        self.max_size = max_size
+        self.paths = OrderedDict()  # key: (path, cells)
+        self.cell_keys = {}  # cell: set of keys with a path through cell
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, key):
+        return key in self.paths
+
+    def get(self, key):
+        """
+        Return:
+            List[Point]: copy of the cached path, None on a miss
+        """
+        entry = self.paths.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.paths.move_to_end(key)
+        return list(entry[0])
+
+    def put(self, key, path, cells):
+        """
+        Args:
+            key: cache key
+            path (List[Point]): path to store
+            cells (Iterable[Point]): cells whose change invalidates the path
+        """
+        if key in self.paths:
+            self._remove(key)
+
+        cells = frozenset(cells)
+        self.paths[key] = (tuple(path), cells)
+        for cell in cells:
+            self.cell_keys.setdefault(cell, set()).add(key)
+
+        while len(self.paths) > self.max_size:
+            self._remove(next(iter(self.paths)))
+            self.evictions += 1
+
+    def invalidate(self, cells):
+        """
+        Evicts paths passing through any of the changed cells
+
+        Args:
+            cells (Iterable[Point]): changed cells
+
+        Return:
+            int: number of paths evicted
+        """
+        count = 0
+        for cell in cells:
+            for key in list(self.cell_keys.get(cell, ())):
+                self._remove(key)
+                count += 1
+        self.invalidations += count
+        return count
+
+    def clear(self):
+        self.paths.clear()
+        self.cell_keys.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.paths),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    def _remove(self, key):
+        (_, cells) = self.paths.pop(key)
+        for cell in cells:
+            keys = self.cell_keys[cell]
+            keys.discard(key)
+            if not keys:
+                del self.cell_keys[cell]
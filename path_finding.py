@@ -1,13 +1,33 @@
 import functools
 import itertools
 
+import any_angle
+import bidirectional
+import components
+import d_star_lite
+import flow_field
+import grid_search
 import helper
+import instrumentation
+import jump_point
 import priority_queue
+import resumable_search
+import symmetry_reduction
+from point import Point
 
 
 class PathFinder:
     MAX_VALID_NODES = 10000
-    def __init__(self, movement_cost, heuristic_cost, is_valid_move):
+    ENGINES = ('generic', 'array', 'jps', 'rsr', 'bidirectional')
+    COST_GRID_ENGINES = ('array',)  # engines that apply per cell costs
+    OPEN_LISTS = {
+        'heap': None,
+        'indexed': priority_queue.IndexedHeap,
+        'bucket': priority_queue.BucketQueue,
+    }
+
+    def __init__(self, movement_cost, heuristic_cost, is_valid_move, map_data=None, engine='generic',
+                 rectangles=None, cache=None, open_list='heap', cost_grid=None):
         """
         Initializes the path finder with relevant functions. Helps reduce the number of
         parameters in a function.
@@ -17,6 +37,24 @@ class PathFinder:
             heuristic_cost: assumed movement cost, logically equivalent to g(n)
             is_valid_move: takes a point and returns whether it is a valid position or not,
                 and is used in the a* algorithm to element potential points
+            map_data: Boolean numpy array. True for passable, False for impassable.
+                Required by all engines other than generic
+            engine: search engine used by find_path, find_path_waypoints and search.
+                'generic' uses is_valid_move, 'array' searches map_data directly and
+                'jps' runs jump point search on map_data for octile moves and 'rsr' searches
+                rectangle perimeters of a symmetry_reduction.RectangleDecomposition and
+                'bidirectional' searches map_data from both ends
+            rectangles: preprocessed RectangleDecomposition of map_data used by the 'rsr' engine,
+                built on demand when not given
+            cache: path_cache.PathCache, possibly shared with other path finders, used by
+                find_path and find_path_waypoints when no store is requested. When
+                is_valid_move depends on unit occupancy, such as Map.is_valid_point,
+                subscribe the cache with Map.subscribe_occupancy(cache.invalidate)
+            open_list: default open list of the array engine, one of PathFinder.OPEN_LISTS.
+                'heap' is a heapq list with duplicate entries, 'indexed' a binary heap
+                with decrease-key and 'bucket' a bucket queue for integer costs
+            cost_grid: cost_grid.CostGrid of map_data, movement cost into a cell is scaled by
+                its cell cost. Requires an engine in PathFinder.COST_GRID_ENGINES
 
         Return:
             List[(int, int)]: List of points to take to reach end in the forward direction
@@ -25,6 +63,210 @@ class PathFinder:
         self.movement_cost = movement_cost
         self.heuristic_cost = heuristic_cost
         self.is_valid_move = is_valid_move
+        self.map_data = map_data
+        self.grid = None
+        self.rectangles = rectangles
+        self.engine = None
+        self.cache = cache
+        self.flow_fields = None
+        self.components = {}  # tuple(moves): components.ComponentIndex
+        self.map_version = 0  # changes whenever the whole map is replaced
+        self.nodes_expanded = 0  # nodes expanded by the last search
+        if open_list not in PathFinder.OPEN_LISTS:
+            raise ValueError("unknown open list {}, expected one of {}".format(open_list,
+                                                                             tuple(PathFinder.OPEN_LISTS)))
+        self.open_list = open_list
+        self.instrumentation = None
+        self.unit = None  # name of the unit in instrumentation records
+        self.cost_grid = None
+        self.cell_costs = None  # flat padded cost multipliers of the grid cells
+        if map_data is not None:
+            self.grid = grid_search.Grid(map_data)
+        self.set_engine(engine)
+        if cost_grid is not None:
+            self.set_cost_grid(cost_grid)
+
+    def set_engine(self, engine):
+        """
+        Selects the search engine used for path queries
+
+        Args:
+            engine: one of PathFinder.ENGINES
+        """
+        if engine not in PathFinder.ENGINES:
+            raise ValueError("unknown engine {}, expected one of {}".format(engine, PathFinder.ENGINES))
+        if engine != 'generic' and self.grid is None:
+            raise ValueError("engine {} requires map_data".format(engine))
+        if self.cost_grid is not None and engine not in PathFinder.COST_GRID_ENGINES:
+            raise ValueError("engine {} cannot apply a cost grid, expected one of {}".format(
+                engine, PathFinder.COST_GRID_ENGINES))
+        if engine == 'rsr' and self.rectangles is None:
+            self.rectangles = symmetry_reduction.RectangleDecomposition.build(self.map_data)
+        self.engine = engine
+
+    def set_map(self, map_data):
+        """
+        Replaces the map searched by grid based engines. Cached paths of the
+        previous map are no longer returned.
+
+        Args:
+            map_data: Boolean numpy array. True for passable, False for impassable.
+        """
+        self.map_data = map_data
+        self.grid = grid_search.Grid(map_data)
+        self.rectangles = None
+        self.flow_fields = None
+        self.components = {}
+        self.map_version += 1
+        self.set_engine(self.engine)
+        if self.cost_grid is not None:
+            self.cell_costs = self.grid.flatten(self.cost_grid.cost, 1.0)
+
+    def set_cost_grid(self, cost_grid):
+        """
+        Scales movement cost by the cost of the entered cell. The path finder
+        subscribes to the cost grid and updates only the cells that change.
+        Only the engines in PathFinder.COST_GRID_ENGINES apply cell costs, so
+        the engine must be one of them while a cost grid is set.
+
+        Args:
+            cost_grid (CostGrid): cost grid with the shape of map_data, None removes it
+
+        Raises:
+            ValueError: if the engine cannot apply a cost grid
+        """
+        if cost_grid is not None and self.engine not in PathFinder.COST_GRID_ENGINES:
+            raise ValueError("engine {} cannot apply a cost grid, expected one of {}".format(
+                self.engine, PathFinder.COST_GRID_ENGINES))
+        if self.cost_grid is not None:
+            self.cost_grid.unsubscribe(self._cost_changed)
+        self.cost_grid = cost_grid
+        self.cell_costs = None
+        if cost_grid is None:
+            return
+        if self.grid is None:
+            raise ValueError("cost grid requires map_data")
+        if cost_grid.shape != (self.grid.height, self.grid.width):
+            raise ValueError("cost grid shape {} does not match map shape {}".format(
+                cost_grid.shape, (self.grid.height, self.grid.width)))
+        self.cell_costs = self.grid.flatten(cost_grid.cost, 1.0)
+        cost_grid.subscribe(self._cost_changed)
+
+    def _cost_changed(self, ys, xs, costs):
+        grid, cell_costs = self.grid, self.cell_costs
+        indices = (ys + grid.pad) * grid.stride + xs + grid.pad
+        for index, cost in zip(indices.tolist(), costs.tolist()):
+            cell_costs[index] = cost
+        if self.cache is not None:
+            self.cache.invalidate(Point(x, y) for y, x in zip(ys.tolist(), xs.tolist()))
+
+    def update_cells(self, changes):
+        """
+        Applies changes to individual cells. Grid based engines see the new
+        values and cached paths through the changed cells are evicted.
+
+        Args:
+            changes: iterable of (point, passable) pairs
+        """
+        changes = list(changes)
+        if self.grid is not None:
+            for point, passable in changes:
+                self.grid.set_passable(point, passable)
+            if self.rectangles is not None:
+                self.rectangles.update(changes)
+        if self.flow_fields is not None:
+            self.flow_fields.update_cells(changes)
+        for index in self.components.values():
+            index.update_cells(changes)
+        if self.cache is not None:
+            self.cache.invalidate(point for point, _ in changes)
+
+    def cache_key(self, moves, start, end):
+        return (start, end, tuple(moves), self.movement_cost, self.heuristic_cost, self.is_valid_move,
+                self.engine, self.map_version, self.cost_grid)
+
+    def instrument(self, instrumentation, unit=None):
+        """
+        Records every search into instrumentation, see instrumentation.Instrumentation.
+        Pass None to stop recording.
+
+        Args:
+            instrumentation (Instrumentation): collector, possibly shared with other path finders
+            unit: name of the unit the records are grouped under
+        """
+        self.instrumentation = instrumentation
+        self.unit = unit
+
+    def search(self, moves, start, end, max_nodes=MAX_VALID_NODES, open_list=None):
+        """
+        Runs the selected engine. Every engine returns a store with the same
+        format as generic_a_star. When map_data is given, pairs in different
+        connected components are rejected with an empty store without searching.
+
+        Args:
+            moves: list of allowed moves at each point
+            start: x and y coordinates of start point
+            end: x and y coordinates of end point
+            max_nodes: max number of valid nodes to process
+            open_list: open list of the array engine for this query, one of
+                PathFinder.OPEN_LISTS, the path finder default if None
+
+        Returns:
+            store: contains the all the states encountered with links to parent states
+        """
+        if self.instrumentation is None:
+            return self._search(moves, start, end, max_nodes, open_list)
+
+        self.instrumentation.begin(self.unit, self.engine)
+        store = self._search(moves, start, end, max_nodes, open_list)
+        path_length = len(PathFinder._get_path_from_store(end, store)) if end in store else 0
+        self.instrumentation.end(store, self.nodes_expanded, path_length)
+        return store
+
+    def _search(self, moves, start, end, max_nodes, open_list):
+        if self.grid is not None and not self.is_reachable(moves, start, end):
+            self.nodes_expanded = 0
+            return {}
+        if self.engine == 'bidirectional':
+            return self.bidirectional_a_star(moves, start, end, max_nodes)
+        if self.engine == 'rsr':
+            return self.rsr_search(moves, start, end, max_nodes)
+        if self.engine == 'jps':
+            return self.jump_point_search(moves, start, end, max_nodes)
+        if self.engine == 'array':
+            return self.array_a_star(moves, start, end, max_nodes, open_list)
+        return self.generic_a_star(moves, start, end, max_nodes)
+
+    def component_index(self, moves):
+        """
+        Return:
+            ComponentIndex: connected components of map_data for the move set,
+                built on first use and kept up to date by update_cells
+        """
+        if self.grid is None:
+            raise ValueError("component index requires map_data")
+        key = tuple(moves)
+        if key not in self.components:
+            self.components[key] = components.ComponentIndex(self.grid.map_data(), moves)
+        return self.components[key]
+
+    def is_reachable(self, moves, start, end):
+        """
+        Return:
+            bool: False if end can certainly not be reached from start, O(1) after
+                the component index of the move set has been built
+        """
+        return self.component_index(moves).is_reachable(start, end)
+
+    def reachable_goal(self, moves, start, end):
+        """
+        Redirects an unreachable goal to the closest cell that can be reached
+
+        Return:
+            Point: end if reachable, else the closest reachable cell to end, None if
+                nothing can be reached from start
+        """
+        return self.component_index(moves).nearest_reachable(start, end)
 
     @staticmethod
     def _get_path_from_store(end, store):
@@ -49,7 +291,7 @@ class PathFinder:
         Takes start and end point and returns a list of points indicating path in the forward direction
 
         Args:
-            *args: arguments required by generic_a_star function
+            *args: arguments required by search function
             return_store: returns the store as well if set to True
 
         Return:
@@ -57,21 +299,55 @@ class PathFinder:
             Dictionary{point: (score, parent)}: Optional. Dictionary containing all points that were evaluated
         """
 
-        store = self.generic_a_star(*args)
-        if not store:  # if store is empty return empty path
-            if return_store:
-                return [], {}
-            else:
-                return []
-
-        end = args[2]  # 3rd argument contains end point
-        path = PathFinder._get_path_from_store(end, store)
+        if self.cache is not None and not return_store:
+            return self._cached_path(*args)
 
+        path, store = self._search_path(*args)
         if return_store:
             return path, store
         else:
             return path
 
+    def _search_path(self, *args):
+        store = self.search(*args)
+        if not store:  # if store is empty return empty path
+            return [], {}
+
+        end = args[2]  # 3rd argument contains end point
+        return PathFinder._get_path_from_store(end, store), store
+
+    def _cached_path(self, *args):
+        """
+        Looks up the path in the cache and searches on a miss. Only paths that
+        were found are cached, together with the cells they pass through.
+        """
+        (moves, start, end) = args[:3]
+        key = self.cache_key(moves, start, end)
+        path = self.cache.get(key)
+        if path is None:
+            path, _ = self._search_path(*args)
+            if path:
+                self.cache.put(key, path, [start] + path)
+        return path
+
+    @staticmethod
+    def join_segments(paths):
+        """
+        Joins the paths of consecutive waypoint segments. Each segment path starts
+        after its start waypoint and ends on its end waypoint, so the segments
+        are concatenated as they are.
+
+        Args:
+            paths: List of segment paths in waypoint order
+
+        Return:
+            List[Point]: joined path, empty if any segment could not be calculated
+        """
+        # if any path is empty, the path cannot be calculated
+        if not all(paths):
+            return []
+        return list(itertools.chain.from_iterable(paths))
+
     def find_path_waypoints(self, moves, waypoints, return_store=False):
         """
         Takes a list of waypoint and returns a list of points indicating a path passing through all the waypoints in
@@ -90,19 +366,13 @@ class PathFinder:
         paths = []
         stores = []
         for start, end in helper.pairwise(waypoints):
-            stores.append(self.generic_a_star(moves, start, end))
-            paths.append(PathFinder._get_path_from_store(end, stores[-1]))
-
-        path = []
-        end = waypoints[-1]
-        # if any path is empty, the path cannot be calculated
-        if all(paths):
-            for path in paths:
-                path.pop()
-
-            paths[-1].append(end)
-            path = list(itertools.chain.from_iterable(paths))
+            if self.cache is not None and not return_store:
+                paths.append(self._cached_path(moves, start, end))
+            else:
+                stores.append(self.search(moves, start, end))
+                paths.append(PathFinder._get_path_from_store(end, stores[-1]))
 
+        path = PathFinder.join_segments(paths)
         if return_store:
             # lazy merge stores, z = {**x, **y}, common keys
             # in x and y written over by value of y
@@ -111,12 +381,43 @@ class PathFinder:
         else:
             return path
 
+    def find_path_any_angle(self, moves, start, end, max_nodes=MAX_VALID_NODES, lazy=True):
+        """
+        Any-angle path on map_data with Theta*, see any_angle.theta_star. Only the
+        points where the path changes direction are returned, any_angle.expand or
+        any_angle.iter_steps turn them back into single steps. Move sets other
+        than octile are searched with array_a_star and the path is compacted,
+        pass the same moves to expand to get that path back.
+
+        Args:
+            moves: list of allowed moves at each point
+            start: x and y coordinates of start point
+            end: x and y coordinates of end point
+            max_nodes: max number of valid nodes to process
+            lazy (bool): use Lazy Theta*, fewer line of sight checks
+
+        Return:
+            List[Point]: waypoints after start, empty if no path was found
+        """
+        if self.grid is None:
+            raise ValueError("any-angle paths require map_data")
+        if not self.is_reachable(moves, start, end):
+            self.nodes_expanded = 0
+            return []
+        if not jump_point.is_octile(moves):
+            path, _ = self._search_path(moves, start, end, max_nodes)
+            return any_angle.compact(start, path)
+
+        waypoints, self.nodes_expanded = any_angle.theta_star(self.grid, moves, start, end, self.movement_cost,
+                                                              self.heuristic_cost, max_nodes, lazy)
+        return waypoints
+
     def find_step(self, *args):
         """
         Takes start and end point and returns next step in the forward direction
 
         Args:
-            *args: arguments required by generic_a_star function
+            *args: arguments required by search function
 
         Return:
             (int, int): List of points to take to reach end in the forward direction
@@ -124,30 +425,93 @@ class PathFinder:
 
         return self.find_path(*args)[0]
 
-    def repair_path(self, moves, prev_path, m_steps):
+    def bidirectional_a_star(self, moves, start, end, max_nodes=MAX_VALID_NODES):
+        """
+        Performs a bidirectional a* search on map_data, see
+        bidirectional.bidirectional_a_star. Paths have the same cost as
+        array_a_star. Requires a symmetric move set and heuristic, asymmetric
+        move sets fall back to array_a_star.
+
+        Args:
+            moves: list of allowed moves at each point
+            start: x and y coordinates of start point
+            end: x and y coordinates of end point
+            max_nodes: max number of valid nodes to process
+
+        Returns:
+            store: same format as generic_a_star
+        """
+        if not bidirectional.is_symmetric(moves):
+            return self.array_a_star(moves, start, end, max_nodes)
+
+        store, self.nodes_expanded = bidirectional.bidirectional_a_star(self.grid, moves, start, end,
+                                                                        self.movement_cost, self.heuristic_cost,
+                                                                        max_nodes)
+        return store
+
+    def incremental_planner(self, moves, start, end, max_nodes=MAX_VALID_NODES, private=False):
         """
-        Takes an existing path and performs repair/recomputation upto m steps ahead
+        Creates a D* Lite planner for one unit and destination that keeps its
+        search state between turns. Subscribe planner.notify to map changes and
+        call planner.move_to as the unit moves, see d_star_lite.DStarLite.
+        notify writes changes into the grid shared with this path finder, its
+        components, rectangles and cache are only updated by update_cells.
 
         Args:
             moves: list of allowed moves at each point
-            prev_path: previously calculated path where head of list indicates current position
-            m_steps: number of steps ahead, to repair
+            start: x and y coordinates of start point
+            end: x and y coordinates of end point
+            max_nodes: max number of nodes expanded by a single repair
+            private (bool): give the planner its own copy of the grid, so it can
+                be told about cells that are only blocked for its unit, such as
+                cells held by other units
 
         Return:
-            List[(int, int)]: List of points to take to reach end in the forward direction
+            DStarLite: planner sharing the grid of this path finder unless private
         """
+        if self.grid is None:
+            raise ValueError("incremental planner requires map_data")
+        grid = grid_search.Grid(self.grid.map_data(), self.grid.pad) if private else self.grid
+        return d_star_lite.DStarLite(grid, moves, start, end, self.movement_cost, self.heuristic_cost, max_nodes)
 
-        start = moves[0]
-        end_index = m_steps if m_steps < len(prev_path) else -1
-        end = prev_path[end_index]
+    def resumable_search(self, moves, start, end):
+        """
+        Creates an a* search that is advanced within a node or time budget and
+        continued on later ticks, see resumable_search.ResumableSearch. Until it
+        finishes, partial_path gives a path towards the most promising node.
 
-        repaired_path = self.find_path(moves, start, end)
+        Args:
+            moves: list of allowed moves at each point
+            start: x and y coordinates of start point
+            end: x and y coordinates of end point
 
-        # extend path when end point is not same as end of previous path
-        if end_index != -1:
-            return repaired_path.extend(prev_path[end_index:-1])
-        else:
-            return repaired_path
+        Return:
+            ResumableSearch: paused search, call advance to run it
+        """
+        if self.grid is None:
+            raise ValueError("resumable search requires map_data")
+        return resumable_search.ResumableSearch(self.grid, moves, start, end, self.movement_cost,
+                                                self.heuristic_cost)
+
+    def flow_field(self, moves, end):
+        """
+        Cost-to-go and best move from every cell of the map to end, computed once
+        per destination and shared by all units heading there, see
+        flow_field.compute_flow_field. Like other grid engines it reads passable
+        cells from map_data instead of calling is_valid_move.
+
+        Args:
+            moves: list of allowed moves at each point
+            end: x and y coordinates of destination
+
+        Return:
+            FlowField: field that gives the next step of any cell in O(1)
+        """
+        if self.grid is None:
+            raise ValueError("flow fields require map_data")
+        if self.flow_fields is None:
+            self.flow_fields = flow_field.FlowFieldCache(self.grid.map_data(), self.movement_cost)
+        return self.flow_fields.field(moves, end)
 
     def generic_a_star(self, moves, start, end, max_nodes=MAX_VALID_NODES):
         """
@@ -177,6 +541,7 @@ class PathFinder:
         queue = priority_queue.PriorityQueue()
         queue.push((self.heuristic_cost(start, end), start))
         store = {start: (0, start)}
+        self.nodes_expanded = 0
 
         while not queue.is_empty():
             (_, cur_pos) = queue.pop()
@@ -184,6 +549,8 @@ class PathFinder:
             if cur_pos == end or max_nodes <= 0:
                 return store  # return store on reaching end or when exhausted nodes
 
+            self.nodes_expanded += 1
+
             next_moves = [cur_pos + move for move in moves]
             valid_moves = [move for move in next_moves if self.is_valid_move(move)]
             max_nodes -= len(valid_moves)
@@ -197,6 +564,79 @@ class PathFinder:
 
         return {}
 
+    def array_a_star(self, moves, start, end, max_nodes=MAX_VALID_NODES, open_list=None):
+        """
+        Performs an a* search directly on map_data using flat cell indices and
+        preallocated score and parent arrays, see grid_search.array_a_star.
+        Unlike generic_a_star it does not call is_valid_move, passable cells
+        are read from map_data.
+
+        Args:
+            moves: list of allowed moves at each point
+            start: x and y coordinates of start point
+            end: x and y coordinates of end point
+            max_nodes: max number of valid nodes to process
+            open_list: one of PathFinder.OPEN_LISTS, the path finder default if None
+
+        Returns:
+            store: same format as generic_a_star
+        """
+        if open_list is None:
+            open_list = self.open_list
+        open_list = PathFinder.OPEN_LISTS[open_list]
+        if self.instrumentation is not None and self.instrumentation.current is not None:
+            open_list = instrumentation.counting(open_list or priority_queue.HeapQueue, self.instrumentation.current)
+        store, self.nodes_expanded = grid_search.array_a_star(self.grid, moves, start, end, self.movement_cost,
+                                                              self.heuristic_cost, max_nodes, open_list,
+                                                              self.cell_costs)
+        return store
+
+    def jump_point_search(self, moves, start, end, max_nodes=MAX_VALID_NODES):
+        """
+        Performs jump point search on map_data, see jump_point.jump_point_search.
+        Paths have the same cost as an a* search with the same moves while far
+        fewer nodes are expanded. Only octile moves have symmetries that can be
+        pruned, other move sets fall back to array_a_star.
+
+        Args:
+            moves: list of allowed moves at each point
+            start: x and y coordinates of start point
+            end: x and y coordinates of end point
+            max_nodes: max number of jump points to process
+
+        Returns:
+            store: same format as generic_a_star
+        """
+        if not jump_point.is_octile(moves):
+            return self.array_a_star(moves, start, end, max_nodes)
+
+        store, self.nodes_expanded = jump_point.jump_point_search(self.grid, start, end, self.movement_cost,
+                                                                  self.heuristic_cost, max_nodes)
+        return store
+
+    def rsr_search(self, moves, start, end, max_nodes=MAX_VALID_NODES):
+        """
+        Performs an a* search that skips the interior of empty rectangles, see
+        symmetry_reduction.rsr_search. Supports linear and octile moves, other
+        move sets fall back to array_a_star.
+
+        Args:
+            moves: list of allowed moves at each point
+            start: x and y coordinates of start point
+            end: x and y coordinates of end point
+            max_nodes: max number of valid nodes to process
+
+        Returns:
+            store: same format as generic_a_star
+        """
+        if not symmetry_reduction.supports(moves):
+            return self.array_a_star(moves, start, end, max_nodes)
+
+        store, self.nodes_expanded = symmetry_reduction.rsr_search(self.rectangles, moves, start, end,
+                                                                   self.movement_cost, self.heuristic_cost,
+                                                                   max_nodes)
+        return store
+
     def best_potential_step(self, game_map, cur_unit):
         """
         Finds the point with the best potential score for the next step.
@@ -219,25 +659,3 @@ class PathFinder:
         potential_values = game_map.next_pos_potential(cur_unit, next_pos)
         best_state = min(potential_values)
         return best_state[1]
-
-    def reconstruct_path(self, moves, cur_pos, path):
-        """
-        TODO
-        Reconstructs a new path from current position,
-        that joins the given path at some point.
-
-        Note: consider intersecting intersecting further along the
-        path based on point sensitivity TODO
-
-        Args:
-            moves: set of moves possible on each turn
-            cur_pos: current position of unit
-            path: previous path from which unit has deviated
-
-        Return:
-            New path
-        """
-        dest = path.popleft()
-        correction = self.find_path(moves, cur_pos, dest)
-        path.extendleft(correction.reverse())
-        return path
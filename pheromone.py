@@ -1,7 +1,24 @@
 import numpy as np
 from point import Point
 class pheromone(object):
-    def __init__(self,obstacleData,possible_moves,decayRate = 0.7,dropOff = 0.1):
+    """
+    Pheromone map of enemy sightings. Cells above dropOff spread their decayed
+    value to their free neighbours every propogate, obstacles are -1.
+
+    The map is kept either dense, as a numpy array, or sparse, as the sorted
+    flat indices and values of the cells that differ from an empty map. Only
+    cells above dropOff spread, so propagating a sparse map costs O(active cells)
+    instead of O(map). With mode 'auto' the map turns sparse when less than
+    SPARSE_FILL of the cells are set and dense again above DENSE_FILL. Both
+    modes give identical maps. Reading map in sparse mode materialises a dense
+    copy, kept until the next change, so write through addEnemy rather than
+    into map.
+    """
+
+    SPARSE_FILL = 0.02
+    DENSE_FILL = 0.05
+
+    def __init__(self,obstacleData,possible_moves,decayRate = 0.7,dropOff = 0.1,mode = 'auto'):
         # initialize map size of obstacles and set obstacles position as -1
         self.map = np.zeros(shape = obstacleData.shape, dtype = np.float32) - obstacleData
         self.obstacleData = obstacleData
@@ -10,22 +27,145 @@ class pheromone(object):
         self.moves.append(Point(0,0))
         self.multiplier = (1 - decayRate) #normalize
         self.temp = np.zeros(shape = self.map.shape,dtype = np.float32)
+        self.spreadDtype = self.temp.dtype  # dtype shares are summed in, float after the first propogate
+        # spread order: moves sorted so every cell receives its shares in row major order of the source cells,
+        # the order in which propogate_point adds them
+        self.spreadMoves = sorted(self.moves, key = lambda move: (-move.x, -move.y))
+        self.free = ~np.asarray(obstacleData, dtype = bool)
+        self.freeNeighbours = np.zeros(shape = self.map.shape, dtype = np.int64)  # cells that receive a share
+        for move in self.spreadMoves:
+            source, target = shiftSlices(move, self.map.shape)
+            self.freeNeighbours[source] += self.free[target]
+        self.moveRows = np.array([move.x for move in self.moves], dtype = np.int64)
+        self.moveColumns = np.array([move.y for move in self.moves], dtype = np.int64)
+
+        # sparse state: values of the cells at flat indices, every other cell is 0 or obstacleValue
+        self.indices = np.zeros(0, dtype = np.int64)
+        self.values = np.zeros(0, dtype = self.map.dtype)
+        self.obstacleValue = self.map.dtype.type(-1)
+        self.dense = None  # materialised sparse map
+        if mode not in ('auto', 'dense', 'sparse'):
+            raise ValueError("unknown mode {}".format(mode))
+        if mode == 'sparse' and not self.sparseAllowed():
+            raise ValueError("sparse mode needs dropOff >= 0 and decayRate <= 1")
+        self.mode = mode
+        self.updateMode()
         return
 
+    @property
+    def map(self):
+        if not self.sparse:
+            return self._map
+        if self.dense is None:
+            self.dense = np.zeros(shape = self.free.shape, dtype = self.values.dtype)
+            self.dense[~self.free] = self.obstacleValue
+            self.dense.ravel()[self.indices] = self.values
+        return self.dense
+
+    @map.setter
+    def map(self, values):
+        self._map = values
+        self.sparse = False
+        self.dense = None
+
     def addEnemy(self,x,y):
-        self.map[x][y] = 1.0
+        if not self.sparse:
+            self.map[x][y] = 1.0
+            return
+        rows, columns = self.free.shape
+        index = range(rows)[x] * columns + range(columns)[y]
+        position = np.searchsorted(self.indices, index)
+        if position < len(self.indices) and self.indices[position] == index:
+            self.values[position] = 1.0
+        else:
+            self.indices = np.insert(self.indices, position, index)
+            self.values = np.insert(self.values, position, 1.0)
+        self.dense = None
         
     def decay(self):
-        self.map = self.map*self.multiplier
+        if not self.sparse:
+            self.map = self.map*self.multiplier
+            return
+        self.values = self.values*self.multiplier
+        self.obstacleValue = self.obstacleValue*self.multiplier
+        self.dense = None
+
+    def sparseAllowed(self):
+        # with no negative values or shares, cells outside the sparse set never exceed dropOff
+        return self.dropOff >= 0 and self.multiplier >= 0
+
+    def fill(self):
+        """Fraction of cells that differ from an empty map."""
+        if self.sparse:
+            return len(self.indices) / self.free.size
+        # only called right after a propagation, when obstacles are exactly -1
+        return np.count_nonzero(np.where(self.free, self._map != 0, self._map != -1)) / self.free.size
+
+    def updateMode(self):
+        if self.mode == 'dense' or not self.sparseAllowed():
+            if self.sparse:
+                self.toDense()
+            return
+        fill = self.fill()
+        if self.sparse and self.mode == 'auto' and fill > self.DENSE_FILL:
+            self.toDense()
+        elif not self.sparse and (self.mode == 'sparse' or fill < self.SPARSE_FILL):
+            self.indices = np.flatnonzero(np.where(self.free, self._map != 0, self._map != -1))
+            self.values = self._map.ravel()[self.indices]
+            self.obstacleValue = self._map.dtype.type(-1)
+            self.sparse = True
+            self.dense = None
+            self._map = None
+
+    def toDense(self):
+        self.map = self.map  # materialised copy becomes the dense map
 
     def propogate(self):
-        for i,rows in enumerate(self.map):
-            for j,value in enumerate(rows):
-                if value > self.dropOff:
-                    self.propogate_point(value,i,j)
-                
+        if self.sparse:
+            self.propogateSparse()
+        else:
+            self.propogateDense()
+        self.spreadDtype = np.dtype(float)
+        self.updateMode()
+
+    def propogateSparse(self):
+        # shares added in (source, move) order, the order of propogate_point
+        spreading = self.values > self.dropOff
+        sources = self.indices[spreading]
+        counts = self.freeNeighbours.ravel()[sources]
+        shares = (self.values[spreading] * self.multiplier) / counts.astype(self.values.dtype)
+        sources, shares = sources[counts > 0], shares[counts > 0]
+
+        rows, columns = self.free.shape
+        targetRows = (sources // columns)[:, None] + self.moveRows[None, :]
+        targetColumns = (sources % columns)[:, None] + self.moveColumns[None, :]
+        inside = (targetRows >= 0) & (targetRows < rows) & (targetColumns >= 0) & (targetColumns < columns)
+        reached = np.zeros(inside.shape, dtype = bool)
+        reached[inside] = self.free[targetRows[inside], targetColumns[inside]]
+        targets = (targetRows * columns + targetColumns)[reached]
+        shares = np.broadcast_to(shares[:, None], reached.shape)[reached]
+
+        indices, order = np.unique(targets, return_inverse = True)
+        values = np.zeros(len(indices), dtype = self.spreadDtype)
+        np.add.at(values, order, shares)
+        kept = values != 0
+        self.indices, self.values = indices[kept], values[kept]
+        self.obstacleValue = self.values.dtype.type(-1)
+        self.dense = None
+
+    def propogateDense(self):
+        # every cell above dropOff shares value * multiplier equally among its free neighbours and itself
+        spreading = (self.map > self.dropOff) & (self.freeNeighbours > 0)
+        share = np.zeros(shape = self.map.shape, dtype = self.map.dtype)
+        share[spreading] = (self.map[spreading] * self.multiplier) / self.freeNeighbours[spreading].astype(self.map.dtype)
+        if self.temp.dtype != self.spreadDtype:
+            self.temp = np.zeros(shape = self.map.shape, dtype = self.spreadDtype)
+        for move in self.spreadMoves:
+            source, target = shiftSlices(move, self.map.shape)
+            np.add(self.temp[target], share[source], out = self.temp[target], where = self.free[target])
+
         self.map = self.temp - self.obstacleData
-        self.temp = np.zeros(shape = self.map.shape,dtype = float)
+        self.temp.fill(0)
 
 
     def propogate_point(self,value,x,y):
@@ -42,3 +182,15 @@ class pheromone(object):
         delta = (value * self.multiplier)/len(changes)
         for pos in changes:
             self.temp[pos[0]][pos[1]] +=delta
+
+
+def shiftSlices(move, shape):
+    """
+    Returns (source, target) slices such that map[target] are the cells reached
+    by move from the cells map[source], moves are (row, column) offsets
+    """
+    slices = ([], [])
+    for offset, size in zip(move, shape):
+        slices[0].append(slice(max(-offset, 0), size - max(offset, 0)))
+        slices[1].append(slice(max(offset, 0), size - max(-offset, 0)))
+    return tuple(slices[0]), tuple(slices[1])
@@ -0,0 +1,78 @@
+import numpy as np
+
+"""
+Vectorised evaluation of the potential of many positions against many actors.
+Actors provide a kernel, poten_many(xs, ys), that scores numpy arrays of
+coordinates in one go. Actors without a kernel are scored point by point with
+poten_at.
+
+Scores are identical to summing poten_at values in Python. Sums follow numpy
+scalar promotion: Python numbers adapt to the dtype of numpy scalars, so an
+actor with numpy_scalars set, such as EnemyObject on a float32 pheromone map,
+turns the running sum into float32 just as it does when adding scalars.
+"""
+
+
+class Potentials:
+    """Scores of a list of positions together with their scalar kind."""
+
+    def __init__(self, values, weak):
+        """
+        Args:
+            values: numpy array of scores
+            weak (bool): scores behave like Python numbers rather than numpy scalars
+        """
+        self.values = values
+        self.weak = weak
+
+    def __add__(self, other):
+        if self.weak and other.weak:
+            return Potentials(self.values + other.values, True)
+        if self.weak:
+            return Potentials(self.values.astype(other.values.dtype) + other.values, False)
+        if other.weak:
+            return Potentials(self.values + other.values.astype(self.values.dtype), False)
+        return Potentials(self.values + other.values, False)
+
+    def tolist(self):
+        return self.values.tolist()
+
+
+def coordinates(positions):
+    """
+    Return:
+        (xs, ys): int numpy arrays of the coordinates of positions
+    """
+    xs = np.fromiter((pos.x for pos in positions), dtype=np.int64, count=len(positions))
+    ys = np.fromiter((pos.y for pos in positions), dtype=np.int64, count=len(positions))
+    return xs, ys
+
+
+def actor_potentials(actor, positions, xs, ys):
+    kernel = getattr(actor, 'poten_many', None)
+    values = None if kernel is None else kernel(xs, ys)
+    if values is not None:
+        return Potentials(values, not getattr(actor, 'numpy_scalars', False))
+
+    scores = [actor.poten_at(pos) for pos in positions]
+    if all(isinstance(score, (int, float)) for score in scores):
+        return Potentials(np.array(scores, dtype=float), True)
+    return Potentials(np.array(scores), False)
+
+
+def evaluate(actors, positions):
+    """
+    Total potential of every position due to all actors
+
+    Args:
+        actors: objects with poten_at and optionally poten_many
+        positions (List[Point]): positions to score
+
+    Return:
+        Potentials: scores in the order of positions
+    """
+    xs, ys = coordinates(positions)
+    total = Potentials(np.zeros(len(positions)), True)
+    for actor in actors:
+        total = total + actor_potentials(actor, positions, xs, ys)
+    return total
@@ -0,0 +1,238 @@
+import hashlib
+from collections import OrderedDict
+
+import math
+
+import numpy as np
+import scipy.ndimage
+
+from terrain import potential
+
+"""
+Composition of full map potential fields such as terrain.potential.coulomb
+obstacle repulsion, goal attraction, enemy threat from a pheromone map and
+attraction to a path. Each field is a named, weighted layer built by a
+function of some inputs. A layer is only rebuilt when its inputs change and
+recently built fields are kept, so switching back to an earlier goal costs a
+lookup.
+
+Units sample the combined field at their next_pos() or any other points, which
+only reads the sampled cells of each layer. The full combined map is summed
+on demand by field() and kept until a layer changes.
+
+Like potential_func, +ve potential implies repulsion and -ve potential implies
+attraction.
+"""
+
+
+def goal_attraction(shape, goal, xi=1 / 700):
+    """
+    Args:
+        shape: (m, n) shape of the map
+        goal (Point): attracting point
+        xi: attractive force
+
+    Return:
+        Numpy array, paraboloid with its minimum at goal, see terrain.potential.goalpost
+    """
+    return potential.goalpost(shape, (goal.x, goal.y), xi)
+
+
+def enemy_threat(threat):
+    """
+    Args:
+        threat: numpy array of threat such as pheromone.map, obstacles are negative there
+
+    Return:
+        Numpy array, threat with obstacle values clipped to 0
+    """
+    return np.clip(np.asarray(threat, dtype=float), 0, None)
+
+
+def path_attraction(shape, points):
+    """
+    Args:
+        shape: (m, n) shape of the map
+        points (List[Point]): path to follow
+
+    Return:
+        Numpy array, euclidean distance to the nearest path point, 0 on the path
+    """
+    off_path = np.ones(shape, dtype=bool)
+    for point in points:
+        off_path[point.y, point.x] = False
+    if off_path.all():
+        return np.zeros(shape)
+    return scipy.ndimage.distance_transform_edt(off_path)
+
+
+def input_key(value):
+    """
+    Hashable key of a layer input. Numpy arrays are keyed by their contents,
+    lists by their items.
+    """
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        return 'array', value.shape, value.dtype.str, hashlib.sha1(value.tobytes()).hexdigest()
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__, tuple(input_key(item) for item in value)
+    if isinstance(value, dict):
+        return 'dict', tuple(sorted((key, input_key(item)) for key, item in value.items()))
+    return value
+
+
+class Layer:
+    """One weighted field with the inputs it was built from and its cache of earlier builds."""
+
+    def __init__(self, shape, build, weight, cache_size):
+        self.shape = shape
+        self.build = build
+        self.weight = weight
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # input key: field
+        self.key = None
+        self.values = None
+        self.builds = 0  # number of fields built, cache hits excluded
+
+    def update(self, inputs):
+        """
+        Return:
+            bool: True if the field changed
+        """
+        key = input_key(inputs)
+        if key == self.key:
+            return False
+        values = self.cache.pop(key, None)
+        if values is None:
+            values = np.asarray(self.build(*inputs), dtype=float)
+            if values.shape != self.shape:
+                raise ValueError("layer shape {} does not match map shape {}".format(values.shape, self.shape))
+            self.builds += 1
+        self.cache[key] = values
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        self.key, self.values = key, values
+        return True
+
+
+class FieldCompositor:
+    """
+    Weighted sum of named potential field layers over a map. Can be added to
+    Map.mock as it scores points with poten_at and poten_many like the other
+    mock objects.
+    """
+
+    def __init__(self, shape, cache_size=8):
+        """
+        Args:
+            shape: (m, n) shape of the map
+            cache_size (int): builds kept per layer for inputs seen before
+        """
+        self.shape = tuple(shape)
+        self.cache_size = cache_size
+        self.layers = OrderedDict()  # name: Layer
+        self._field = None  # combined field, None while stale
+
+    def set_layer(self, name, build, inputs=(), weight=1.0):
+        """
+        Adds or updates a layer. The field is built with build(*inputs) unless
+        the layer already holds or has cached the field of equal inputs.
+
+        Args:
+            name: layer name
+            build (func): function returning a numpy array of map shape
+            inputs (tuple): arguments of build
+            weight: multiplier of the layer in the combined field
+
+        Return:
+            bool: True if the field of the layer changed
+        """
+        layer = self.layers.get(name)
+        if layer is None or layer.build is not build:
+            layer = Layer(self.shape, build, weight, self.cache_size)
+            layer.update(tuple(inputs))
+            self.layers[name] = layer
+            self._field = None
+            return True
+
+        self.set_weight(name, weight)
+        if not layer.update(tuple(inputs)):
+            return False
+        self._field = None
+        return True
+
+    def set_weight(self, name, weight):
+        layer = self.layers[name]
+        if layer.weight != weight:
+            layer.weight = weight
+            self._field = None
+
+    @property
+    def builds(self):
+        """Number of fields built by the current layers, cache hits excluded."""
+        return sum(layer.builds for layer in self.layers.values())
+
+    def remove_layer(self, name):
+        del self.layers[name]
+        self._field = None
+
+    def layer(self, name):
+        """
+        Return:
+            Numpy array, unweighted field of the layer
+        """
+        return self.layers[name].values
+
+    def field(self):
+        """
+        Return:
+            Numpy array, weighted sum of all layers, summed once per change
+        """
+        if self._field is None:
+            field = np.zeros(self.shape)
+            for layer in self.layers.values():
+                field += layer.weight * layer.values
+            self._field = field
+        return self._field
+
+    def sample_many(self, xs, ys):
+        """
+        Combined field at numpy arrays of x and y coordinates, inf outside the
+        map. Reads the cached combined field if there is one, otherwise only
+        the sampled cells of each layer.
+        """
+        m, n = self.shape
+        inside = (xs >= 0) & (xs < n) & (ys >= 0) & (ys < m)
+        scores = np.full(len(xs), math.inf)
+        xs, ys = xs[inside], ys[inside]
+        if self._field is not None:
+            scores[inside] = self._field[ys, xs]
+        else:
+            values = np.zeros(len(xs))
+            for layer in self.layers.values():
+                values += layer.weight * layer.values[ys, xs]
+            scores[inside] = values
+        return scores
+
+    def sample(self, points):
+        """
+        Return:
+            List[float]: combined field at each point, inf outside the map
+        """
+        xs = np.fromiter((point.x for point in points), dtype=np.int64, count=len(points))
+        ys = np.fromiter((point.y for point in points), dtype=np.int64, count=len(points))
+        return self.sample_many(xs, ys).tolist()
+
+    def sample_next_pos(self, unit):
+        """
+        Return:
+            List[(float, Point)]: combined field at each of the next positions of unit
+        """
+        next_pos = unit.next_pos()
+        return list(zip(self.sample(next_pos), next_pos))
+
+    def poten_at(self, pos):
+        return self.sample([pos])[0]
+
+    def poten_many(self, xs, ys):
+        return self.sample_many(xs, ys)
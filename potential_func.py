@@ -2,6 +2,8 @@ from functools import partial
 
 import math
 
+import numpy as np
+
 from point import Point
 
 """
@@ -16,6 +18,10 @@ that include:
 
 Potential here is analogous to elelctro-static potential, i.e +ve potential
 implies repulsion and -ve potential implies attraction.
+
+Every potential function has a vectorised kernel with the same arguments,
+except that dest is replaced by numpy arrays xs and ys of destination
+coordinates. Kernels give the same values as their function, see vectorised.
 """
 
 
@@ -103,6 +109,53 @@ def decided_path_at(path, slope):
     return partial(decided_path, path, slope)
 
 
+def _squared_dist(point, xs, ys):
+    return (xs - point.x) ** 2 + (ys - point.y) ** 2
+
+
+def inert_repel_many(cur_pos, xs, ys):
+    return np.where((xs == cur_pos.x) & (ys == cur_pos.y), math.inf, 0.0)
+
+
+def linear_cutoff_many(cur_pos, cutoff, xs, ys):
+    dist = _squared_dist(cur_pos, xs, ys) - cutoff
+    return np.where(dist < 0, math.inf, np.maximum(4 - dist, 0)).astype(float)
+
+
+def decided_path_point_many(cur_pos, slope, index, xs, ys):
+    dist = _squared_dist(cur_pos, xs, ys)
+    return np.minimum(-index - 4 + dist * slope, 0).astype(float)
+
+
+def decided_path_many(path, slope, xs, ys):
+    scores = [decided_path_point_many(point, slope, i, xs, ys) for i, point in enumerate(path)]
+    return np.min(scores, axis=0)
+
+
+KERNELS = {
+    inert_repel: inert_repel_many,
+    linear_cutoff: linear_cutoff_many,
+    decided_path_point: decided_path_point_many,
+    decided_path: decided_path_many,
+}
+
+
+def vectorised(func):
+    """
+    Kernel of a potential function or of a function curried with partial
+
+    Return:
+        function(*args, xs, ys): kernel taking the remaining arguments, None if
+            func has no kernel
+    """
+    if isinstance(func, partial):
+        if func.keywords:
+            return None
+        kernel = KERNELS.get(func.func)
+        return None if kernel is None else partial(kernel, *func.args)
+    return KERNELS.get(func)
+
+
 if __name__ == "__main__":
     from itertools import combinations
 
@@ -21,7 +21,7 @@ class PriorityQueue:
 
 
 class SimpleQueue:
-    def __init(self):
+    def __init__(self):
         self.elements = deque()
 
     def push(self, element):
@@ -32,3 +32,189 @@ class SimpleQueue:
 
     def is_empty(self):
         return len(self.elements) == 0
+
+
+class HeapQueue:
+    """
+    heapq list of (priority, item) pairs with the push and pop interface of
+    IndexedHeap. Pushing a queued item adds a duplicate entry, the caller
+    skips stale entries when they are popped.
+    """
+
+    def __init__(self):
+        self.heap = []
+
+    def __len__(self):
+        return len(self.heap)
+
+    def is_empty(self):
+        return not self.heap
+
+    def push(self, priority, item):
+        heapq.heappush(self.heap, (priority, item))
+        return True
+
+    def pop(self):
+        return heapq.heappop(self.heap)
+
+
+class IndexedHeap:
+    """
+    Binary heap of (priority, item) pairs that holds every item at most once.
+    Pushing an item that is already queued with a lower priority moves it up
+    in place (decrease-key) instead of adding a duplicate entry, so the heap
+    never grows beyond the number of queued items.
+    """
+
+    def __init__(self):
+        self.heap = []  # (priority, item) pairs
+        self.position = {}  # item: index in heap
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, item):
+        return item in self.position
+
+    def is_empty(self):
+        return not self.heap
+
+    def priority(self, item):
+        return self.heap[self.position[item]][0]
+
+    def push(self, priority, item):
+        """
+        Inserts item, or lowers its priority if it is queued with a higher one
+
+        Return:
+            bool: whether the heap changed
+        """
+        index = self.position.get(item)
+        if index is None:
+            self.heap.append((priority, item))
+            self._sift_up(len(self.heap) - 1)
+            return True
+        if priority < self.heap[index][0]:
+            self.heap[index] = (priority, item)
+            self._sift_up(index)
+            return True
+        return False
+
+    def pop(self):
+        """
+        Return:
+            (priority, item): entry with the lowest priority
+        """
+        heap = self.heap
+        top = heap[0]
+        last = heap.pop()
+        del self.position[top[1]]
+        if heap:
+            heap[0] = last
+            self.position[last[1]] = 0
+            self._sift_down(0)
+        return top
+
+    def _sift_up(self, index):
+        heap, position = self.heap, self.position
+        entry = heap[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if entry[0] < heap[parent][0]:
+                heap[index] = heap[parent]
+                position[heap[index][1]] = index
+                index = parent
+            else:
+                break
+        heap[index] = entry
+        position[entry[1]] = index
+
+    def _sift_down(self, index):
+        heap, position = self.heap, self.position
+        size = len(heap)
+        entry = heap[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if heap[child][0] < entry[0]:
+                heap[index] = heap[child]
+                position[heap[index][1]] = index
+                index = child
+            else:
+                break
+        heap[index] = entry
+        position[entry[1]] = index
+
+
+class BucketQueue:
+    """
+    Monotone bucket queue for small non-negative integer priorities, such as
+    the f values of A* with linear_cost or diagonal_cost and integer scales.
+    Buckets are lists indexed by priority and a cursor walks up to the lowest
+    non-empty bucket, so push and pop are O(1) amortised instead of O(log n).
+    Items in the same bucket are popped last in first out.
+
+    Like IndexedHeap every item is queued at most once. A push with a lower
+    priority leaves the old entry behind, it is skipped when its bucket is
+    reached.
+    """
+
+    def __init__(self):
+        self.buckets = []
+        self.cursor = 0
+        self.priorities = {}  # item: current priority
+
+    def __len__(self):
+        return len(self.priorities)
+
+    def __contains__(self, item):
+        return item in self.priorities
+
+    def is_empty(self):
+        return not self.priorities
+
+    def priority(self, item):
+        return self.priorities[item]
+
+    def push(self, priority, item):
+        """
+        Inserts item, or lowers its priority if it is queued with a higher one
+
+        Args:
+            priority (int): non-negative integer priority
+
+        Return:
+            bool: whether the queue changed
+        """
+        current = self.priorities.get(item)
+        if current is not None and current <= priority:
+            return False
+        if priority != int(priority) or priority < 0:
+            raise ValueError("bucket queue requires non-negative integer priorities, got {}".format(priority))
+        priority = int(priority)
+        buckets = self.buckets
+        if priority >= len(buckets):
+            buckets.extend([] for _ in range(priority + 1 - len(buckets)))
+        buckets[priority].append(item)
+        self.priorities[item] = priority
+        if priority < self.cursor:
+            self.cursor = priority
+        return True
+
+    def pop(self):
+        """
+        Return:
+            (priority, item): entry with the lowest priority
+        """
+        buckets, priorities = self.buckets, self.priorities
+        while True:
+            bucket = buckets[self.cursor]
+            while bucket:
+                item = bucket.pop()
+                if priorities.get(item) == self.cursor:
+                    del priorities[item]
+                    return self.cursor, item
+            self.cursor += 1
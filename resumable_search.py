@@ -0,0 +1,146 @@
+import heapq
+import math
+import time
+
+from point import Point
+
+
+class ResumableSearch:
+    """
+    A* search on a grid_search.Grid that can be advanced in slices and paused
+    when a node or wall clock budget runs out, then continued on the next tick.
+    Search state is kept in the object, not in the shared grid arrays, so any
+    number of searches can be paused at the same time.
+
+    While the search is unfinished, partial_path gives the path to the most
+    promising node found so far, the one with the lowest heuristic, so a unit
+    can keep moving in the right direction.
+    """
+
+    SEARCHING = 'searching'
+    FOUND = 'found'
+    UNREACHABLE = 'unreachable'
+
+    CLOCK_CHECK = 64  # expansions between wall clock checks
+
+    def __init__(self, grid, moves, start, end, movement_cost, heuristic_cost):
+        """
+        Args:
+            grid (Grid): map to search on
+            moves: list of allowed moves at each point
+            start (Point): start point
+            end (Point): end point
+            movement_cost: real movement cost function
+            heuristic_cost: assumed movement cost function
+        """
+        self.grid = grid
+        self.heuristic_cost = heuristic_cost
+        self.end = end
+        origin = Point(0, 0)
+        self.steps = list(zip(grid.offsets(moves), [movement_cost(origin, move) for move in moves]))
+
+        self.start_index = grid.index(start)
+        self.end_index = grid.index(end)
+        self.g = {self.start_index: 0}
+        self.parent = {self.start_index: self.start_index}
+        self.closed = set()
+        h = heuristic_cost(start, end)
+        self.queue = [(h, h, self.start_index)]
+        self.best = (h, 0, self.start_index)  # (h, g, index) of most promising node
+        self.nodes_expanded = 0
+        self.status = ResumableSearch.SEARCHING
+        if not grid.contains(start):
+            self.status = ResumableSearch.UNREACHABLE
+
+    @property
+    def done(self):
+        return self.status != ResumableSearch.SEARCHING
+
+    def advance(self, max_nodes=None, time_budget=None):
+        """
+        Expands nodes until the search finishes or a budget runs out
+
+        Args:
+            max_nodes (int): maximum number of nodes to expand in this call
+            time_budget (float): maximum wall clock time in seconds for this call
+
+        Return:
+            str: status, one of SEARCHING, FOUND or UNREACHABLE
+        """
+        if self.done:
+            return self.status
+
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        budget = math.inf if max_nodes is None else max_nodes
+        passable, to_point, end = self.grid.passable, self.grid.point, self.end
+        g, parent, closed, queue = self.g, self.parent, self.closed, self.queue
+        heuristic_cost, heappush, heappop = self.heuristic_cost, heapq.heappush, heapq.heappop
+
+        expanded = 0
+        while queue:
+            if expanded >= budget:
+                return self.status
+            if deadline is not None and expanded % ResumableSearch.CLOCK_CHECK == 0 \
+                    and expanded and time.perf_counter() >= deadline:
+                return self.status
+
+            (_, h_cur, cur) = heappop(queue)
+            if cur in closed:
+                continue
+            if cur == self.end_index:
+                self.status = ResumableSearch.FOUND
+                self.best = (0, g[cur], cur)
+                return self.status
+
+            closed.add(cur)
+            expanded += 1
+            self.nodes_expanded += 1
+            cur_score = g[cur]
+            for offset, cost in self.steps:
+                nxt = cur + offset
+                if not passable[nxt] or nxt in closed:
+                    continue
+                next_score = cur_score + cost
+                if next_score < g.get(nxt, math.inf):
+                    g[nxt] = next_score
+                    parent[nxt] = cur
+                    h = heuristic_cost(to_point(nxt), end)
+                    heappush(queue, (next_score + h, h, nxt))
+                    if (h, next_score) < self.best[:2]:
+                        self.best = (h, next_score, nxt)
+
+        self.status = ResumableSearch.UNREACHABLE
+        return self.status
+
+    def _path_to(self, index):
+        path = []
+        while self.parent[index] != index:
+            path.append(self.grid.point(index))
+            index = self.parent[index]
+        path.reverse()
+        return path
+
+    def path(self):
+        """
+        Return:
+            List[Point]: path to end if it has been found, empty list otherwise
+        """
+        if self.status != ResumableSearch.FOUND:
+            return []
+        return self._path_to(self.end_index)
+
+    def partial_path(self):
+        """
+        Return:
+            List[Point]: path to end if found, otherwise path to the node closest
+                to end according to the heuristic
+        """
+        return self._path_to(self.best[2])
+
+    def next_step(self):
+        """
+        Return:
+            Point: first step of the partial path, None if there is no progress to make
+        """
+        path = self.partial_path()
+        return path[0] if path else None
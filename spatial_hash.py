@@ -0,0 +1,161 @@
+import functools
+
+import numpy as np
+
+from point import Point
+
+
+class SightShape:
+    """
+    Precomputed form of a sight range, a list of offsets such as
+    moves.bc19_9_radius(). Shared by all units with the same range.
+    """
+
+    def __init__(self, offsets):
+        self.offsets = frozenset(offsets)
+        self.reach = max((max(abs(offset.x), abs(offset.y)) for offset in self.offsets), default=0)
+        size = 2 * self.reach + 1
+        self.mask = np.zeros((size, size), dtype=bool)  # [dy + reach, dx + reach]
+        for offset in self.offsets:
+            self.mask[offset.y + self.reach, offset.x + self.reach] = True
+
+    def __contains__(self, offset):
+        return offset in self.offsets
+
+
+@functools.lru_cache(maxsize=None)
+def _sight_shape(offsets):
+    return SightShape(offsets)
+
+
+def sight_shape(offsets):
+    """
+    Return:
+        SightShape: shape of the offsets, the same object for equal offsets
+    """
+    return _sight_shape(tuple(offsets))
+
+
+class SpatialHash:
+    """
+    Uniform grid of buckets holding the units in each cell_size x cell_size
+    block of the map. Queries only visit the buckets that overlap the query
+    area, so they cost O(nearby units) rather than O(all units). Results come
+    in bucket order and insertion order within a bucket, independent of object
+    ids, so they are the same between runs.
+    """
+
+    def __init__(self, cell_size=8):
+        """
+        Args:
+            cell_size (int): width and height of a bucket in map cells
+        """
+        self.cell_size = cell_size
+        self.buckets = {}  # (bucket x, bucket y): {unit: None}, insertion ordered
+        self.positions = {}  # unit: position
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, unit):
+        return unit in self.positions
+
+    def _bucket(self, pos):
+        return pos.x // self.cell_size, pos.y // self.cell_size
+
+    def insert(self, unit, pos):
+        if unit in self.positions:
+            self.remove(unit)
+        if pos is None:
+            return
+        self.positions[unit] = pos
+        self.buckets.setdefault(self._bucket(pos), {})[unit] = None
+
+    def remove(self, unit):
+        pos = self.positions.pop(unit, None)
+        if pos is None:
+            return
+        key = self._bucket(pos)
+        bucket = self.buckets[key]
+        del bucket[unit]
+        if not bucket:
+            del self.buckets[key]
+
+    def move(self, unit, pos):
+        """Updates the position of a unit, only touches buckets when it changes bucket."""
+        old_pos = self.positions.get(unit)
+        if old_pos is None or pos is None or self._bucket(old_pos) != self._bucket(pos):
+            self.insert(unit, pos)
+        else:
+            self.positions[unit] = pos
+
+    def clear(self):
+        self.buckets = {}
+        self.positions = {}
+
+    def nearby(self, pos, reach):
+        """
+        Yields:
+            (unit, position): units within reach cells of pos in x and y
+        """
+        size = self.cell_size
+        buckets, positions = self.buckets, self.positions
+        for bucket_x in range((pos.x - reach) // size, (pos.x + reach) // size + 1):
+            for bucket_y in range((pos.y - reach) // size, (pos.y + reach) // size + 1):
+                for unit in buckets.get((bucket_x, bucket_y), ()):
+                    other = positions[unit]
+                    if abs(other.x - pos.x) <= reach and abs(other.y - pos.y) <= reach:
+                        yield unit, other
+
+    def within_radius(self, pos, radius):
+        """
+        Return:
+            List[unit]: units with euclidean distance to pos of at most radius
+        """
+        reach = int(radius)
+        squared = radius * radius
+        return [unit for unit, other in self.nearby(pos, reach) if pos.dist(other) <= squared]
+
+    def visible(self, pos, shape):
+        """
+        Args:
+            pos (Point): position of the viewer
+            shape (SightShape): sight of the viewer
+
+        Return:
+            List[unit]: units at an offset from pos within shape
+        """
+        offsets = shape.offsets
+        return [unit for unit, other in self.nearby(pos, shape.reach)
+                if Point(other.x - pos.x, other.y - pos.y) in offsets]
+
+
+def visibility_matrix(positions, shapes):
+    """
+    Visibility between every pair of units in one batch of numpy operations
+
+    Args:
+        positions (List[Point]): position of each unit
+        shapes (List[SightShape]): sight of each unit
+
+    Return:
+        Boolean numpy array, [i, j] is True if unit i sees unit j
+    """
+    count = len(positions)
+    visible = np.zeros((count, count), dtype=bool)
+    if not count:
+        return visible
+    coords = np.array([(pos.x, pos.y) for pos in positions])
+    delta = coords[None, :, :] - coords[:, None, :]  # [i, j] offset from i to j
+
+    # viewers with the same shape share one lookup
+    groups = {}
+    for viewer, shape in enumerate(shapes):
+        groups.setdefault(id(shape), (shape, []))[1].append(viewer)
+    for shape, viewers in groups.values():
+        dx, dy = delta[viewers, :, 0], delta[viewers, :, 1]
+        inside = (np.abs(dx) <= shape.reach) & (np.abs(dy) <= shape.reach)
+        rows = np.zeros(dx.shape, dtype=bool)
+        rows[inside] = shape.mask[dy[inside] + shape.reach, dx[inside] + shape.reach]
+        visible[viewers] = rows
+    return visible
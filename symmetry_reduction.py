@@ -0,0 +1,389 @@
+import heapq
+
+import numpy as np
+
+from mapworks.map_generator import map_digest
+from moves import adjacent_linear, adjacent_octile
+from point import Point
+
+"""
+Rectangular Symmetry Reduction (Harabor, Botea and Kilby, 2011). The passable
+area of a static map is decomposed once into empty rectangles. A search then
+only visits cells on rectangle perimeters, interiors are crossed with macro
+edges whose cost is the exact grid distance inside the empty rectangle.
+
+Macro edges of a perimeter cell are computed from the rectangle geometry when
+the cell is expanded:
+    - grid neighbours that are not in the interior of its own rectangle
+    - edges to cells on the opposite side that can be reached through the
+      interior, for linear moves only the cell directly across
+    - for octile moves, the two inward diagonal rays until they hit the
+      perimeter, which covers paths to the adjacent sides
+A start or end point inside an interior is connected to the perimeter of its
+rectangle for the duration of a query.
+"""
+
+OCTILE_MOVES = frozenset(adjacent_octile())
+LINEAR_MOVES = frozenset(adjacent_linear())
+
+
+def supports(moves):
+    return frozenset(moves) in (OCTILE_MOVES, LINEAR_MOVES)
+
+
+class RectangleDecomposition:
+    """
+    Decomposition of the passable area of a map into empty rectangles.
+
+    rect_id is an int32 array of map shape with the index of the rectangle
+    containing each cell, -1 for impassable cells. rects is an int32 array of
+    (left, top, right, bottom) inclusive bounds, one row per rectangle.
+    """
+
+    def __init__(self, rect_id, rects, digest=None):
+        self.rect_id = rect_id
+        self.rects = rects
+        self.digest = digest
+        self.shape = rect_id.shape
+        self.rows = rect_id.tolist()  # nested lists are faster to index from python
+
+    @classmethod
+    def build(cls, map_data):
+        """
+        Greedy decomposition. Cells are visited in row major order and each
+        free cell grows the largest square it can, which is then stretched
+        right and down as far as possible.
+
+        Args:
+            map_data: Boolean numpy array. True for passable, False for impassable.
+        """
+        free = np.array(map_data, dtype=bool)
+        rect_id = np.full(free.shape, -1, dtype=np.int32)
+        rects = _greedy_rectangles(free)
+        for index, (left, top, right, bottom) in enumerate(rects):
+            rect_id[top:bottom + 1, left:right + 1] = index
+        rects = np.array(rects, dtype=np.int32).reshape(-1, 4)
+        return cls(rect_id, rects, map_digest(map_data))
+
+    def update(self, changes):
+        """
+        Applies cell changes by decomposing again only the rectangles that
+        contain a changed cell, together with the cells that became passable.
+        Costs O(affected area) rather than O(map), but freed cells are not merged
+        into neighbouring rectangles, so the decomposition may fragment over many
+        updates compared to build. digest is cleared as the decomposition no
+        longer belongs to the map it was built or loaded for.
+
+        Args:
+            changes: iterable of (point, passable) pairs
+        """
+        m, n = self.shape
+        changes = [(point, bool(passable)) for point, passable in changes if 0 <= point.x < n and 0 <= point.y < m]
+        if not changes:
+            return
+        rect_id = self.rect_id
+        affected = {int(rect_id[point.y, point.x]) for point, _ in changes} - {-1}
+        rects = self.rects.tolist()
+
+        # bounding box of the affected rectangles and changed cells
+        bounds = [rects[index] for index in affected] + [(p.x, p.y, p.x, p.y) for p, _ in changes]
+        left, top = min(b[0] for b in bounds), min(b[1] for b in bounds)
+        right, bottom = max(b[2] for b in bounds), max(b[3] for b in bounds)
+        window = rect_id[top:bottom + 1, left:right + 1]
+        free = np.isin(window, list(affected))
+        window[free] = -1
+        for point, passable in changes:
+            free[point.y - top, point.x - left] = passable
+
+        holes = sorted(affected)
+        touched = [(left, top, right, bottom)]
+        for (x, y, x2, y2) in _greedy_rectangles(free):
+            rect = (x + left, y + top, x2 + left, y2 + top)
+            if holes:
+                index = holes.pop(0)
+                rects[index] = rect
+            else:
+                index = len(rects)
+                rects.append(rect)
+            window[y:y2 + 1, x:x2 + 1] = index
+
+        # fill the remaining holes with the last rectangles to keep ids contiguous
+        holes = set(holes)
+        while holes:
+            last = len(rects) - 1
+            if last in holes:
+                holes.discard(last)
+            else:
+                hole = min(holes)
+                holes.discard(hole)
+                rects[hole] = rects[last]
+                (x, y, x2, y2) = rects[hole]
+                rect_id[y:y2 + 1, x:x2 + 1] = hole
+                touched.append(rects[hole])
+            rects.pop()
+
+        self.rects = np.array(rects, dtype=np.int32).reshape(-1, 4)
+        for (x, y, x2, y2) in touched:
+            for row in range(y, y2 + 1):
+                self.rows[row][x:x2 + 1] = rect_id[row, x:x2 + 1].tolist()
+        self.digest = None
+
+    def save(self, path):
+        """
+        Save decomposition as a numpy .npz file, usually next to the map it was built for
+        """
+        np.savez_compressed(path, rect_id=self.rect_id, rects=self.rects, digest=np.array(self.digest))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['rect_id'], data['rects'], str(data['digest']))
+
+    @classmethod
+    def load_or_build(cls, map_data, path):
+        """
+        Load the decomposition saved at path, or build and save it when the file
+        is missing or was built for a different map.
+
+        Args:
+            map_data: Boolean numpy array. True for passable, False for impassable.
+            path: location of the .npz file
+        """
+        try:
+            decomposition = cls.load(path)
+            if decomposition.digest == map_digest(map_data):
+                return decomposition
+        except (IOError, KeyError, ValueError):
+            pass
+
+        decomposition = cls.build(map_data)
+        decomposition.save(path)
+        return decomposition
+
+    def interior_ratio(self):
+        """
+        Fraction of passable cells that are pruned from searches
+        """
+        left, top, right, bottom = self.rects.T
+        inner = np.maximum(right - left - 1, 0) * np.maximum(bottom - top - 1, 0)
+        passable = np.count_nonzero(self.rect_id >= 0)
+        return inner.sum() / passable if passable else 0.0
+
+
+def _greedy_rectangles(free):
+    """
+    Greedy decomposition of the True cells of free, see RectangleDecomposition.build.
+    Clears free.
+
+    Return:
+        List[(int, int, int, int)]: (left, top, right, bottom) inclusive bounds
+    """
+    m, n = free.shape
+    rects = []
+    for y in range(m):
+        row = free[y]
+        for x in np.flatnonzero(row):
+            if not free[y, x]:
+                continue
+            right, bottom = x, y
+            while right + 1 < n and bottom + 1 < m and free[bottom + 1, x:right + 2].all() \
+                    and free[y:bottom + 1, right + 1].all():
+                right += 1
+                bottom += 1
+            while right + 1 < n and free[y:bottom + 1, right + 1].all():
+                right += 1
+            while bottom + 1 < m and free[bottom + 1, x:right + 1].all():
+                bottom += 1
+
+            free[y:bottom + 1, x:right + 1] = False
+            rects.append((int(x), y, int(right), bottom))
+    return rects
+
+
+def _octile(dx, dy, lin, diag):
+    dx, dy = abs(dx), abs(dy)
+    return min(dx, dy) * diag + abs(dx - dy) * lin
+
+
+def _interpolate(start, end, diagonal_first):
+    """
+    Cells on a straight or diagonal first path inside an empty rectangle,
+    excluding start and including end.
+    """
+    dx, dy = end.x - start.x, end.y - start.y
+    sx, sy = (dx > 0) - (dx < 0), (dy > 0) - (dy < 0)
+    cells = []
+    cur = start
+    if diagonal_first:
+        for _ in range(min(abs(dx), abs(dy))):
+            cur = Point(cur.x + sx, cur.y + sy)
+            cells.append(cur)
+    while cur.x != end.x:
+        cur = Point(cur.x + sx, cur.y)
+        cells.append(cur)
+    while cur.y != end.y:
+        cur = Point(cur.x, cur.y + sy)
+        cells.append(cur)
+    return cells
+
+
+class _Query:
+    """
+    Successor generation for one query. Works on points and keeps start and end
+    inserted into their rectangles.
+    """
+
+    def __init__(self, decomposition, octile, start, end, lin, diag):
+        self.rect_id = decomposition.rows
+        self.rects = decomposition.rects.tolist()
+        self.height, self.width = decomposition.shape
+        self.octile = octile
+        self.moves = adjacent_octile() if octile else adjacent_linear()
+        self.start = start
+        self.end = end
+        self.lin = lin
+        self.diag = diag
+        self.end_rect = self.rect_of(end)
+
+    def rect_of(self, point):
+        if 0 <= point.x < self.width and 0 <= point.y < self.height:
+            return self.rect_id[point.y][point.x]
+        return -1
+
+    def cost(self, a, b):
+        if self.octile:
+            return _octile(b.x - a.x, b.y - a.y, self.lin, self.diag)
+        return (abs(b.x - a.x) + abs(b.y - a.y)) * self.lin
+
+    def is_interior(self, point, rect):
+        left, top, right, bottom = self.rects[rect]
+        return left < point.x < right and top < point.y < bottom
+
+    def perimeter(self, rect):
+        left, top, right, bottom = self.rects[rect]
+        cells = [Point(x, y) for x in range(left, right + 1) for y in (top, bottom)]
+        cells.extend(Point(x, y) for y in range(top + 1, bottom) for x in (left, right))
+        return set(cells)
+
+    def successors(self, cur):
+        rect = self.rect_of(cur)
+        if rect == self.end_rect and self.end != cur and self.is_interior(self.end, rect):
+            yield self.end
+        if self.is_interior(cur, rect):  # only start or end can be interior
+            yield from self.perimeter(rect)
+            return
+
+        left, top, right, bottom = self.rects[rect]
+        for move in self.moves:
+            nxt = cur + move
+            nxt_rect = self.rect_of(nxt)
+            if nxt_rect == -1 or (nxt_rect == rect and self.is_interior(nxt, rect)):
+                continue
+            yield nxt
+
+        x, y = cur
+        reach_x, reach_y = right - left, bottom - top
+        if reach_y > 1:
+            for side, across, sy in ((top, bottom, 1), (bottom, top, -1)):
+                if y != side:
+                    continue
+                if self.octile:
+                    for nx in range(max(left, x - reach_y), min(right, x + reach_y) + 1):
+                        yield Point(nx, across)
+                    for sx in (-1, 1):
+                        steps = min(x - left if sx < 0 else right - x, reach_y)
+                        if steps > 1:
+                            yield Point(x + sx * steps, y + sy * steps)
+                else:
+                    yield Point(x, across)
+        if reach_x > 1:
+            for side, across, sx in ((left, right, 1), (right, left, -1)):
+                if x != side:
+                    continue
+                if self.octile:
+                    for ny in range(max(top, y - reach_x), min(bottom, y + reach_x) + 1):
+                        yield Point(across, ny)
+                    for sy in (-1, 1):
+                        steps = min(y - top if sy < 0 else bottom - y, reach_x)
+                        if steps > 1:
+                            yield Point(x + sx * steps, y + sy * steps)
+                else:
+                    yield Point(across, y)
+
+
+def rsr_search(decomposition, moves, start, end, movement_cost, heuristic_cost, max_nodes):
+    """
+    A* search over rectangle perimeters using macro edges. Movement cost is
+    evaluated once for a linear and a diagonal step, macro edge costs are the
+    grid distance across the empty rectangle.
+
+    Args:
+        decomposition (RectangleDecomposition): preprocessed map
+        moves: adjacent_octile or adjacent_linear moves
+        start: x and y coordinates of start point
+        end: x and y coordinates of end point
+        movement_cost: real movement cost function
+        heuristic_cost: assumed movement cost function
+        max_nodes: max number of valid nodes to process
+
+    Returns:
+        (store, expanded): store in the same format as generic_a_star, cells
+            along the path are linked cell by cell, and the number of nodes expanded
+    """
+    octile = frozenset(moves) == OCTILE_MOVES
+    origin = Point(0, 0)
+    lin = movement_cost(origin, Point(1, 0))
+    diag = movement_cost(origin, Point(1, 1))
+    query = _Query(decomposition, octile, start, end, lin, diag)
+    if query.rect_of(start) == -1:
+        return {}, 0
+
+    heappush, heappop = heapq.heappush, heapq.heappop
+    store = {start: (0, start)}
+    h_start = heuristic_cost(start, end)
+    queue = [(h_start, h_start, start)]
+    closed = set()
+    expanded = 0
+
+    while queue:
+        (_, _, cur) = heappop(queue)
+        if cur in closed:
+            continue
+        if cur == end:
+            return _path_store(store, query, start, end), expanded
+        if max_nodes <= 0:
+            return store, expanded
+
+        closed.add(cur)
+        expanded += 1
+        cur_score = store[cur][0]
+        for nxt in query.successors(cur):
+            max_nodes -= 1
+            if nxt in closed:
+                continue
+            next_score = cur_score + query.cost(cur, nxt)
+            if nxt not in store or next_score < store[nxt][0]:
+                store[nxt] = (next_score, cur)
+                h = heuristic_cost(nxt, end)
+                heappush(queue, (next_score + h, h, nxt))
+
+    return {}, expanded
+
+
+def _path_store(store, query, start, end):
+    """
+    Replace macro edges along the path from start to end with single steps
+    """
+    path = [end]
+    while path[-1] != start:
+        path.append(store[path[-1]][1])
+    path.reverse()
+
+    store = dict(store)
+    for prev, cur in zip(path, path[1:]):
+        prev_score = store[prev][0]
+        link = prev
+        for cell in _interpolate(prev, cur, query.octile):
+            store[cell] = (prev_score + query.cost(prev, cell), link)
+            link = cell
+    return store
@@ -1,6 +1,7 @@
 import numpy as np
 import scipy.ndimage
-import helper
+
+from moves import adjacent_octile
 
 
 def coulomb(map_data, d0=2, nu=800, scale=100):
@@ -26,9 +27,9 @@ def goalpost(map_size, goal, xi=1 / 700):
     """
     potn = np.zeros(map_size)
     m, n = map_size
-    for y in range(0, m):
-        for x in range(0, n):
-            potn[y][x] = xi * ((x - goal[0]) * (x - goal[0]) + (y - goal[1]) * (y - goal[1]))
+    dx = np.arange(n)[None, :] - goal[0]
+    dy = np.arange(m)[:, None] - goal[1]
+    potn[:] = xi * (dx * dx + dy * dy)
     return potn
 
 
@@ -40,46 +41,31 @@ def manhattan(map_data, max_depth=5, return_depth_vector=False):
     d) primary return value:    Numpy ndarray for potential height.
     e) optional return value:   Depth vector (list(list(int, int))). Indexed list of points at any given depth.
     """
-    temp_map = map_data * 1
+    passable = np.asarray(map_data).astype(bool)
     depth_map = map_data * 0
-    current_vector = []
+    m, n = passable.shape
+    moves = np.array(adjacent_octile())  # neighbour order of helper.get_neighbors
+
+    # passable cells with an impassable octile neighbour, in row major order
+    boundary = passable & scipy.ndimage.binary_dilation(~passable, structure=np.ones((3, 3), dtype=bool))
+    ys, xs = np.nonzero(boundary)
+    unvisited = passable & ~boundary
     current_depth = -1
-    m, n = map_data.shape
-    for y in range(0, m):
-        for x in range(0, n):
-            if not map_data[y][x]:
-                continue
-            else:
-                nbors = helper.get_neighbors((x, y), (m, n))
-                for p in nbors:
-                    if not map_data[p[1]][p[0]]:
-                        current_vector.append((x, y))
-                        temp_map[y][x] = False
-                        depth_map[y][x] = current_depth
-                        break
-    depth_vector = [current_vector]
-    while len(current_vector) != 0:
+    depth_map[boundary] = current_depth
+    depth_vector = [_points(xs, ys)]
+    while len(xs) != 0:
         current_depth -= 1
         if current_depth == -max_depth:
             break
-        new_vector = []
-        for point in current_vector:
-            nbors = helper.get_neighbors(point, (m, n))
-            for p in nbors:
-                if temp_map[p[1]][p[0]]:
-                    new_vector.append(p)
-                    temp_map[p[1]][p[0]] = 0
-                    depth_map[p[1]][p[0]] = current_depth
-        current_vector = new_vector
-        depth_vector.append(current_vector)
-    if len(current_vector) != 0:
-        new_vector = []
-        for y in range(0, m):
-            for x in range(0, n):
-                if depth_map[y][x] == 0 and map_data[y][x]:
-                    depth_map[y][x] = current_depth
-                    new_vector.append((x, y))
-        depth_vector.append(new_vector)
+        xs, ys = _next_layer(xs, ys, moves, unvisited)
+        unvisited[ys, xs] = False
+        depth_map[ys, xs] = current_depth
+        depth_vector.append(_points(xs, ys))
+    if len(xs) != 0:
+        rest = (depth_map == 0) & passable
+        ys, xs = np.nonzero(rest)
+        depth_map[rest] = current_depth
+        depth_vector.append(_points(xs, ys))
         depth_map += 1
     depth_map = depth_map - current_depth - 1
     depth_vector.reverse()
@@ -89,6 +75,30 @@ def manhattan(map_data, max_depth=5, return_depth_vector=False):
         return depth_map
 
 
+def _points(xs, ys):
+    return list(zip(xs.tolist(), ys.tolist()))
+
+
+def _next_layer(xs, ys, moves, unvisited):
+    """Breadth first layer in the order a queue visits it, each cell reached by
+    its first parent in the current layer, and by the first move of that parent.
+    a) xs, ys:          Numpy arrays of the current layer in visiting order.
+    b) moves:           Numpy array of (x, y) offsets in neighbour order.
+    c) unvisited:       Boolean numpy array of cells that can still be reached.
+    d) return value:    (xs, ys) numpy arrays of the next layer in visiting order.
+    """
+    m, n = unvisited.shape
+    nxs = (xs[:, None] + moves[None, :, 0]).ravel()  # ordered by (parent, move)
+    nys = (ys[:, None] + moves[None, :, 1]).ravel()
+    reached = (nxs >= 0) & (nxs < n) & (nys >= 0) & (nys < m)
+    nxs, nys = nxs[reached], nys[reached]
+    reached = unvisited[nys, nxs]
+    nxs, nys = nxs[reached], nys[reached]
+    _, first = np.unique(nys * n + nxs, return_index=True)
+    first.sort()
+    return nxs[first], nys[first]
+
+
 def distance_transform(map_data, max_depth=6):
     """Generate obstacle field based on distance transform from nearest obstacle.
     a) map_data:                Boolean numpy array. True for passable, False for impassable.
@@ -96,9 +106,5 @@ def distance_transform(map_data, max_depth=6):
     c) return value:    Numpy ndarray for potential height.
     """
     d = np.ceil(scipy.ndimage.distance_transform_edt(map_data))
-    m, n = map_data.shape
-    for y in range(0, m):
-        for x in range(0, n):
-            if d[y][x] > max_depth:
-                d[y][x] = max_depth
+    d[d > max_depth] = max_depth
     return np.negative(d)
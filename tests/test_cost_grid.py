@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from cost_grid import CostGrid
+from movement_cost import diagonal_cost
+from moves import adjacent_linear
+from path_finding import PathFinder
+from point import Point
+
+
+def make_finder(map_data, engine):
+    return PathFinder(diagonal_cost(), diagonal_cost(), lambda point: True, map_data, engine)
+
+
+@pytest.mark.parametrize('engine', ['jps', 'rsr', 'bidirectional'])
+def test_cost_grid_rejects_engines_without_cell_costs(engine):
+    map_data = np.ones((5, 5), dtype=bool)
+    finder = make_finder(map_data, engine)
+    with pytest.raises(ValueError):
+        finder.set_cost_grid(CostGrid(map_data.shape))
+    assert finder.cost_grid is None
+
+    finder = make_finder(map_data, 'array')
+    finder.set_cost_grid(CostGrid(map_data.shape))
+    with pytest.raises(ValueError):
+        finder.set_engine(engine)
+    assert finder.engine == 'array'
+
+
+def test_array_engine_applies_cell_costs():
+    map_data = np.ones((3, 5), dtype=bool)
+    costs = CostGrid(map_data.shape)
+    mud = np.ones(map_data.shape)
+    mud[1, 1:4] = 10  # the straight line through the middle row is expensive
+    costs.set_layer('mud', mud)
+
+    finder = make_finder(map_data, 'array')
+    finder.set_cost_grid(costs)
+    path = finder.find_path(adjacent_linear(), Point(0, 1), Point(4, 1))
+    assert path[-1] == Point(4, 1)
+    assert all(point.y != 1 for point in path[1:-1])
@@ -0,0 +1,25 @@
+import numpy as np
+
+from game_map import Map
+from movement_cost import diagonal_cost
+from moves import adjacent_octile
+from path_finding import PathFinder
+from point import Point
+
+
+def test_notify_alone_applies_blocked_cells():
+    map_data = np.ones((10, 10), dtype=bool)
+    game_map = Map(map_data)
+    finder = PathFinder(diagonal_cost(), diagonal_cost(), game_map.is_valid_point, map_data.copy(), 'array')
+    planner = finder.incremental_planner(adjacent_octile(), Point(0, 5), Point(9, 5))
+    game_map.subscribe(planner.notify)  # the path finder itself is not subscribed
+
+    path = planner.path()
+    assert Point(4, 5) in path
+
+    # wall off column 4 except for its top cell
+    game_map.set_cells((Point(4, y), False) for y in range(1, 10))
+    path = planner.path()
+    assert path and path[-1] == Point(9, 5)
+    assert all(point.x != 4 or point.y == 0 for point in path)
+    assert Point(4, 0) in path
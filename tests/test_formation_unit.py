@@ -0,0 +1,31 @@
+import numpy as np
+
+from formation import Formation
+from game_map import Map
+from point import Point
+from unit import FORMATION, FormationUnit
+
+
+def test_blocked_unit_steps_around_with_its_planner():
+    map_data = np.ones((10, 10), dtype=bool)
+    game_map = Map(map_data)
+    unit = FORMATION.copy(Point(2, 2))
+    formation = Formation(0, [Point(0, 0)], Point(2, 2), [Point(2, 2)], game_map.is_valid_point, map_data, 'array')
+    unit.add_to_formation(formation, True)
+    unit.set_dest(Point(8, 2))
+    unit.game_map = game_map
+    blocker = FORMATION.copy(Point(0, 9))
+    blocker.game_map = game_map
+    game_map.active = [unit, blocker]
+
+    unit.find_path()
+    blocker.cur_pos = unit.path[1]  # a stationary unit on the planned path
+    positions = []
+    for _ in range(FormationUnit.MAX_WAIT + 3):
+        unit.update_pos()
+        positions.append(unit.cur_pos)
+
+    assert unit.planner is not None
+    assert unit.planner.notify in game_map.listeners
+    assert blocker.cur_pos not in positions
+    assert positions[-1].x > blocker.cur_pos.x
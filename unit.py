@@ -4,7 +4,9 @@ from mock_object import PathObject
 from path_finding import PathFinder
 from movement_cost import diagonal_cost, linear_cost
 from moves import adjacent_linear, bc19_9_radius, adjacent_octile
+import potential_func
 from potential_func import inert_repel
+from spatial_hash import sight_shape
 
 
 # TODO: Create subclasses
@@ -28,15 +30,32 @@ class Unit:
         self.next_moves = next_moves
         self.move_cost_func = move_cost_func
         self.sight_range = sight_range
+        self.sight = sight_shape(sight_range)  # shared by units with the same range
         self.game_map = None
         self.path = None
         self.dest = None
         self.path_finder = None
 
+    @property
+    def cur_pos(self):
+        return self._cur_pos
+
+    @cur_pos.setter
+    def cur_pos(self, pos):
+        old_pos = getattr(self, '_cur_pos', None)
+        self._cur_pos = pos
+        game_map = getattr(self, 'game_map', None)
+        if game_map is not None:
+            game_map.move_unit(self, old_pos, pos)  # keeps the occupancy grid in sync
+
     def set_game_state(self, game_map):
         self.game_map = game_map
         self.path_finder = PathFinder(self.move_cost_func, self.move_cost_func, self.game_map.is_valid_point)
 
+    def instrument(self, instrumentation):
+        """Records the path queries of the unit under its name, None stops recording."""
+        self.path_finder.instrument(instrumentation, self.name)
+
     def find_path(self, dest):
         self.dest = dest
         self.path = deque(self.path_finder.find_path(self.next_moves, self.cur_pos, dest))
@@ -57,17 +76,27 @@ class Unit:
         return [self.cur_pos + move for move in self.sight_range]
 
     def visible_from(self, other):
-        return self.cur_pos in other.cur_sight()
+        return other.can_see(self)
 
     def can_see_point(self, other_point):
-        return other_point in self.cur_sight()
+        return other_point - self.cur_pos in self.sight
 
     def can_see(self, other):
-        return other.cur_pos in self.cur_sight()
+        return other.cur_pos - self.cur_pos in self.sight
 
     def poten_at(self, point):
         return self.poten_func(self.cur_pos, point)
 
+    def poten_many(self, xs, ys):
+        """
+        Vectorised poten_at for numpy arrays of x and y coordinates, None if
+        poten_func has no kernel in potential_func
+        """
+        kernel = potential_func.vectorised(self.poten_func)
+        if kernel is None:
+            return None
+        return kernel(self.cur_pos, xs, ys)
+
     def __str__(self):
         return "{}: {}".format(self.name, self.cur_pos)
 
@@ -77,6 +106,7 @@ class Unit:
 
 class FormationUnit(Unit):
     MAX_PREDICT = 5
+    MAX_WAIT = 2  # turns a unit waits for a unit in its way before replanning
 
     def __init__(self, *args):
         super().__init__(*args)
@@ -86,6 +116,9 @@ class FormationUnit(Unit):
         self.path = None
         self.game_map = None
         self.at_objective = False # Temporary measure should be replace by concept of unit state
+        self.blocked_turns = 0
+        self.planner = None  # D* Lite planner for steps around blocking units
+        self.planner_cells = set()  # cells marked impassable in the planner for units in them
 
     def copy(self, cur_pos):
         if not cur_pos:
@@ -96,8 +129,48 @@ class FormationUnit(Unit):
         self.is_leader = is_leader
         self.formation = formation
 
+    def instrument(self, instrumentation):
+        self.formation.path_finder.instrument(instrumentation, self.name)
+
     def set_dest(self, dest):
         self.leader_path = deque(self.formation.init_dest(dest))
+        self.drop_planner()
+
+    def drop_planner(self):
+        if self.planner is not None:
+            self.game_map.unsubscribe(self.planner.notify)
+        self.planner = None
+        self.planner_cells = set()
+
+    def detour_step(self):
+        """
+        Step around the units in the way with the D* Lite planner of the unit.
+        The planner is created on first use with its own grid, heads for the
+        position of the unit at the destination of the formation and is
+        subscribed to map changes. Cells held by nearby units are marked in the
+        planner only, so a detour repairs the search instead of planning again.
+
+        Return:
+            Point: next step, None if there is no way around
+        """
+        path_finder = self.formation.path_finder
+        if self.planner is None:
+            dest = self.formation.dest
+            goal = self.formation.predict_pos_from(dest) or dest
+            self.planner = path_finder.incremental_planner(self.formation.moves, self.cur_pos, goal, private=True)
+            self.game_map.subscribe(self.planner.notify)
+
+        static = self.game_map.static
+        blocked = {unit.cur_pos for unit in self.game_map.units_within(self.cur_pos, 2) if unit is not self}
+        changes = [(cell, static[cell.y][cell.x]) for cell in self.planner_cells - blocked]
+        changes.extend((cell, False) for cell in blocked - self.planner_cells)
+        self.planner.notify(changes)
+        self.planner_cells = blocked
+        self.planner.move_to(self.cur_pos)
+        step = self.planner.next_step()
+        if step is None or not self.game_map.is_valid_point(step):
+            return None
+        return step
 
     def find_path(self):
         if len(self.leader_path) > FormationUnit.MAX_PREDICT:
@@ -119,12 +192,34 @@ class FormationUnit(Unit):
             self.find_path()
 
         self.update_formation()
+        if self.is_leader:
+            self.formation.tick()
         self.leader_path.popleft()
         if not self.leader_path:  # reached objective when leader path is empty
             self.at_objective = True
         next_pos = self.path.popleft()
         if self.game_map.is_valid_point(next_pos):
             self.cur_pos = next_pos
+            self.blocked_turns = 0
+        elif next_pos == self.cur_pos:
+            pass  # step in place, the cell is occupied by the unit itself
+        elif self.game_map.unit_at(next_pos) is not None:
+            self.blocked_turns += 1
+            if self.blocked_turns < FormationUnit.MAX_WAIT:
+                self.path.appendleft(next_pos)  # wait for the unit in the way to move on
+            elif self.formation.path_finder.grid is None:
+                # the unit in the way is not moving on, plan again from the current position
+                self.blocked_turns = 0
+                self.find_path()
+            else:
+                # the unit in the way is not moving on, step around it with the incremental planner
+                self.blocked_turns = 0
+                step = self.detour_step()
+                if step is None:
+                    self.path.appendleft(next_pos)
+                else:
+                    self.cur_pos = step
+                    self.path = deque()  # the formation path is resumed from the new position
         else:
             vis_path = [pos for pos in self.path if self.can_see_point(pos)]
             self.game_map.mock = [PathObject(vis_path)]